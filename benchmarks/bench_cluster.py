@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aiohttp import ClientError, ClientSession, TCPConnector  # noqa: E402
+
+from bench_load import FACULTIES, summarize, user_script  # noqa: E402
+from fake_bot_api import FakeBotAPI, callback_update, text_update  # noqa: E402
+from storage import ConnectionPool, ScheduleRepository  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+WEBHOOK_PATH = "/telegram"
+# Запросы уходят в FakeBotAPI, токену достаточно правильного формата
+BENCH_TOKEN = "123456:" + "x" * 35
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_db(path: str, users: int):
+    from case2 import DAYS_OF_WEEK, TIME_SLOTS
+
+    logging.getLogger().setLevel(logging.WARNING)
+    pool = ConnectionPool(path)
+    repository = ScheduleRepository(pool, DAYS_OF_WEEK, TIME_SLOTS)
+    repository.migrate()
+    for user in range(users):
+        repository.add_group(FACULTIES[user % len(FACULTIES)], 1 + user // len(FACULTIES) % 6, f"LT-{user}")
+    pool.close()
+
+
+async def wait_healthy(session, url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return
+        except ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"{url} не ответил за {timeout} с")
+
+
+async def run_user(session, url, fake, user: int, start_at: float, update_ids, latencies: list, timeout: float):
+    await asyncio.sleep(start_at)
+    chat_id = 100_000 + user
+    expected = 0
+    for _, (kind, payload), replies in user_script(user):
+        update_id = next(update_ids)
+        data = text_update(update_id, chat_id, payload) if kind == "text" else callback_update(update_id, chat_id, payload)
+        expected += replies
+        started = time.perf_counter()
+        async with session.post(url, json=data) as response:
+            await response.read()
+        await fake.wait_for_chat(chat_id, expected, timeout)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_cluster(workers: int, db_path: str, args) -> dict:
+    fake = FakeBotAPI(latency=args.api_latency)
+    await fake.start()
+    port = free_port()
+    env = {**os.environ, "SCHEDULE_DB": db_path, "BOT_MODE": "cluster", "CLUSTER_WORKERS": str(workers),
+           "WEBHOOK_LISTEN": "127.0.0.1", "WEBHOOK_PORT": str(port), "WORKER_BASE_PORT": str(free_port()),
+           "TELEGRAM_API_URL": fake.base_url, "TELEGRAM_BOT_TOKEN": BENCH_TOKEN,
+           "CONCURRENT_UPDATES": str(args.concurrency)}
+    for name in ("WEBHOOK_URL", "WEBHOOK_SECRET", "METRICS_PORT"):
+        env.pop(name, None)
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, "case2.py"), env=env, cwd=ROOT,
+        stdout=asyncio.subprocess.DEVNULL, stderr=None if args.verbose else asyncio.subprocess.DEVNULL,
+    )
+    latencies = []
+    failures = 0
+    try:
+        async with ClientSession(connector=TCPConnector(limit=0)) as session:
+            await wait_healthy(session, f"http://127.0.0.1:{port}/healthz", 120.0)
+            url = f"http://127.0.0.1:{port}{WEBHOOK_PATH}"
+            update_ids = iter(range(1, 10 ** 9))
+            started = time.perf_counter()
+            results = await asyncio.gather(*(
+                run_user(session, url, fake, user, user * args.ramp_up / args.users, update_ids, latencies, args.timeout)
+                for user in range(args.users)
+            ), return_exceptions=True)
+            elapsed = time.perf_counter() - started
+            failures = sum(isinstance(result, BaseException) for result in results)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        await process.wait()
+        await fake.stop()
+    return {"workers": workers, "updates": len(latencies), "failed_users": failures, "elapsed_s": elapsed,
+            "throughput": len(latencies) / elapsed, "latency": summarize(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пропускная способность режима cluster в зависимости от числа воркеров")
+    parser.add_argument("--workers", default="1,2,4", help="список числа воркеров через запятую")
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--ramp-up", type=float, default=1.0)
+    parser.add_argument("--api-latency", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--verbose", action="store_true", help="показывать логи воркеров")
+    args = parser.parse_args()
+    print(f"CPU: {os.cpu_count()}, пользователей: {args.users}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in (int(value) for value in args.workers.split(",")):
+            db_path = os.path.join(tmp, f"cluster-{workers}.db")
+            prepare_db(db_path, args.users)
+            result = asyncio.run(run_cluster(workers, db_path, args))
+            latency = result["latency"]
+            print(f"workers={workers:<3} updates={result['updates']:<6} failed={result['failed_users']:<4} "
+                  f"{result['throughput']:>7.1f} updates/s  p50 {latency['p50_ms']:>8.1f} ms  "
+                  f"p99 {latency['p99_ms']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
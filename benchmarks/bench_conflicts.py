@@ -0,0 +1,121 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from conflicts import IntervalIndex  # noqa: E402
+from storage import ConnectionPool, ScheduleRepository  # noqa: E402
+
+FACULTIES = ["ИЭИС", "ИЦЭУС", "ПИ", "ИБХИ", "ИГУМ", "ИМО", "ИЮР", "ИПТ", "ПТИ"]
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+TIME_SLOTS = [f"с {h}:00 до {h+1}:00" for h in range(6, 21)]
+SUBJECTS = ["Математика", "Физика", "История", "Философия", "Программирование", "Английский язык"]
+PER_DAY = 10
+
+
+def build_db(repo, rows, overlaps, seed=5):
+    rnd = random.Random(seed)
+    groups = max(1, rows // (len(DAYS) * PER_DAY))
+    with repo.pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO groups (id, faculty, course, group_name) VALUES (?, ?, ?, ?)",
+            [(g + 1, FACULTIES[g % len(FACULTIES)], 1 + g % 6, f"Г-{g}") for g in range(groups)]
+        )
+        conn.executemany(
+            "INSERT INTO schedule_entries (group_id, day, start_min, end_min, subject) VALUES (?, ?, ?, ?, ?)",
+            (((i // (len(DAYS) * PER_DAY)) % groups + 1, (i // PER_DAY) % len(DAYS), 480 + i % PER_DAY * 75,
+              540 + i % PER_DAY * 75, SUBJECTS[i % len(SUBJECTS)]) for i in range(rows))
+        )
+        # Занятия со сдвигом на полчаса пересекаются с уже стоящими в сетке
+        conn.executemany(
+            "INSERT INTO schedule_entries (group_id, day, start_min, end_min, subject) VALUES (?, ?, ?, ?, ?)",
+            [(rnd.randrange(groups) + 1, rnd.randrange(len(DAYS)), start, start + 60, "Пересечение")
+             for start in (510 + rnd.randrange(PER_DAY - 1) * 75 for _ in range(overlaps))]
+        )
+        # Длинные занятия накрывают сразу несколько: пересечения между накрытыми тоже должны найтись
+        conn.executemany(
+            "INSERT INTO schedule_entries (group_id, day, start_min, end_min, subject) VALUES (?, ?, ?, ?, ?)",
+            [(rnd.randrange(groups) + 1, rnd.randrange(len(DAYS)), 470, 1200, "Практика")
+             for _ in range(overlaps // 10)]
+        )
+    return groups
+
+
+def self_join_conflicts(repo) -> int:
+    with repo.pool.connection() as conn:
+        return conn.execute("""
+            SELECT COUNT(*) FROM schedule_entries a JOIN schedule_entries b
+              ON b.group_id = a.group_id AND b.day = a.day AND b.id > a.id
+             AND b.start_min < a.end_min AND a.start_min < b.end_min
+        """).fetchone()[0]
+
+
+def timed(label, operations, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    rate = f"{operations / elapsed:>10.0f} ops/s" if operations else ""
+    print(f"{label:<40} {elapsed * 1000:>9.1f} ms {rate}  -> {result}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поиск пересечений в расписании на синтетических данных")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--overlaps", type=int, default=1000)
+    parser.add_argument("--checks", type=int, default=20_000)
+    parser.add_argument("--room-entries", type=int, default=20_000, help="занятий на одну аудиторию в памяти")
+    args = parser.parse_args()
+    rnd = random.Random(9)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"))
+        repo = ScheduleRepository(pool, DAYS, TIME_SLOTS)
+        # Данные со сдвинутыми занятиями заливаются до уникального индекса, как в старой базе
+        repo.migrate()
+        with pool.connection() as conn:
+            conn.execute("DROP INDEX idx_schedule_group_day_start")
+            conn.execute("CREATE INDEX idx_schedule_group_day_start ON schedule_entries (group_id, day, start_min)")
+        groups = timed(f"build db ({args.rows} + {args.overlaps} rows)", 0,
+                       lambda: build_db(repo, args.rows, args.overlaps))
+        timed("report: self-join", 0, lambda: self_join_conflicts(repo))
+        timed("report: single pass over index", 0, lambda: repo.conflict_report(10)[0])
+
+        checks = [(rnd.randrange(groups) + 1, rnd.randrange(len(DAYS)), 480 + rnd.randrange(900)) for _ in range(
+            args.checks)]
+        with pool.connection() as conn:
+            timed("save check: scan group day", args.checks, lambda: sum(
+                conn.execute(
+                    "SELECT COUNT(*) FROM schedule_entries WHERE group_id = ? AND day = ? "
+                    "AND start_min < ? AND end_min > ?", (group_id, day, start + 60, start)
+                ).fetchone()[0] > 0 for group_id, day, start in checks
+            ))
+            # Ближайшее занятие, начавшееся раньше конца нового, ищется по индексу за O(log n)
+            timed("save check: predecessor in index", args.checks, lambda: sum(
+                (row := conn.execute(
+                    "SELECT end_min FROM schedule_entries WHERE group_id = ? AND day = ? AND start_min < ? "
+                    "ORDER BY start_min DESC LIMIT 1", (group_id, day, start + 60)
+                ).fetchone()) is not None and row[0] > start for group_id, day, start in checks
+            ))
+
+        # Аудитория или преподаватель: тысячи занятий под одним ключом
+        room = [(day * 1440 + 360 + slot * 75, day * 1440 + 420 + slot * 75, "Лекция")
+                for day in range(args.room_entries // 12 + 1) for slot in range(12)][:args.room_entries]
+        index = IntervalIndex()
+        timed(f"room index: build ({len(room)} entries)", len(room),
+              lambda: sum(index.add("room", *entry) is None for entry in room))
+        probes = [(rnd.randrange(room[-1][1]), 30) for _ in range(args.checks)]
+        timed("room check: linear scan", len(probes) // 20, lambda: sum(
+            any(s < start + length and start < e for s, e, _ in room) for start, length in probes[:len(probes) // 20]
+        ))
+        timed("room check: bisect", len(probes), lambda: sum(
+            index.find_overlap("room", start, start + length) is not None for start, length in probes
+        ))
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
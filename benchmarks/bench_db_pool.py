@@ -0,0 +1,81 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from storage import ConnectionPool, ScheduleRepository
+
+FACULTY = "ИЭИС"
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+TIME_SLOTS = [f"с {h}:00 до {h+1}:00" for h in range(6, 21)]
+LEGACY_SCHEMA = """
+    CREATE TABLE schedule_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        faculty TEXT NOT NULL,
+        course INTEGER NOT NULL,
+        group_name TEXT NOT NULL,
+        day_of_week TEXT NOT NULL,
+        time_slot TEXT NOT NULL,
+        subject TEXT NOT NULL
+    )
+"""
+
+
+def per_call_save(db_name, i):
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO schedule_entries (faculty, course, group_name, day_of_week, time_slot, subject) VALUES (?, ?, ?, ?, ?, ?)",
+        (FACULTY, 1, f"Г-{i % 50}", DAYS[i % 6], f"с {6 + i % 15}:00 до {7 + i % 15}:00", "Математика")
+    )
+    conn.commit()
+    conn.close()
+
+
+def per_call_read(db_name, i):
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT faculty, course, group_name, day_of_week, time_slot, subject FROM schedule_entries "
+        "WHERE faculty = ? AND course = ? AND group_name = ? AND day_of_week = ? "
+        "ORDER BY faculty, course, group_name, day_of_week, time_slot",
+        (FACULTY, 1, f"Г-{i % 50}", DAYS[i % 6])
+    )
+    cursor.fetchall()
+    conn.close()
+
+
+def run(label, func, ops):
+    started = time.perf_counter()
+    for i in range(ops):
+        func(i)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {ops / elapsed:>10.0f} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пул соединений против sqlite3.connect на каждый вызов")
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        with sqlite3.connect(legacy_db) as conn:
+            conn.execute(LEGACY_SCHEMA)
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"))
+        repo = ScheduleRepository(pool, DAYS, TIME_SLOTS)
+        repo.migrate()
+        run("per-call connect: write", lambda i: per_call_save(legacy_db, i), args.ops)
+        run("per-call connect: read", lambda i: per_call_read(legacy_db, i), args.ops)
+        # Ключи повторяются каждые 150 операций: повтор обновляет занятие, как при повторном импорте
+        run("pool: write", lambda i: repo.upsert_entries([(
+            FACULTY, 1, f"Г-{i % 50}", DAYS[i % 6], 360 + i % 15 * 60, 420 + i % 15 * 60, "Математика")]), args.ops)
+        run("pool: read", lambda i: repo.get_schedule_data(FACULTY, 1, f"Г-{i % 50}", DAYS[i % 6]), args.ops)
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
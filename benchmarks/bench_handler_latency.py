@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from storage import ConnectionPool, DatabaseExecutor, ScheduleRepository
+
+FACULTY = "ИЭИС"
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+TIME_SLOTS = [f"с {h}:00 до {h+1}:00" for h in range(6, 21)]
+
+
+async def simulated_user(user_id, repo, executor, steps, latencies):
+    group = f"Г-{user_id % 200}"
+    for step in range(steps):
+        day = DAYS[step % 6]
+        started = time.perf_counter()
+        if executor is None:
+            repo.get_groups(FACULTY, 1)
+            repo.get_schedule_data(FACULTY, 1, group, day)
+            repo.replace_day(FACULTY, 1, group, day, [(540, 600, "Физика")])
+        else:
+            await executor.run(repo.get_groups, FACULTY, 1)
+            await executor.run(repo.get_schedule_data, FACULTY, 1, group, day)
+            await executor.run(repo.replace_day, FACULTY, 1, group, day, [(540, 600, "Физика")])
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0)
+
+
+async def loop_lag_probe(stop, lags, interval=0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run_mode(label, repo, executor, users, steps):
+    latencies = []
+    lags = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(simulated_user(u, repo, executor, steps, latencies) for u in range(users)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    lags.sort()
+    lag_p99 = lags[max(0, int(len(lags) * 0.99) - 1)] * 1000 if lags else 0.0
+    print(f"{label:<10} handlers={len(latencies):>6} {len(latencies) / elapsed:>8.0f}/s "
+          f"p50={p50:.2f}ms p99={p99:.2f}ms light-handler p99 delay={lag_p99:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка обработчиков при одновременных пользователях")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=10)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"))
+        repo = ScheduleRepository(pool, DAYS, TIME_SLOTS)
+        repo.migrate()
+        executor = DatabaseExecutor(workers=pool.size)
+        asyncio.run(run_mode("blocking", repo, None, args.users, args.steps))
+        asyncio.run(run_mode("executor", repo, executor, args.users, args.steps))
+        executor.shutdown()
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from export import EXPORT_COLUMNS, write_xlsx
+from importer import ScheduleImporter
+from storage import ConnectionPool, ScheduleRepository
+
+FACULTIES = ["ИЭИС", "ИЦЭУС", "ПИ", "ИБХИ", "ИГУМ", "ИМО", "ИЮР", "ИПТ", "ПТИ"]
+COURSES = ["1", "2", "3", "4", "5", "6"]
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+TIME_SLOTS = [f"с {h}:00 до {h+1}:00" for h in range(6, 21)]
+SUBJECTS = ["Математика", "Физика", "История", "Философия", "Программирование", "Английский язык"]
+
+
+def synthetic_rows(rows):
+    per_group = len(DAYS) * len(TIME_SLOTS)
+    for i in range(rows):
+        group = i // per_group
+        yield (FACULTIES[group % len(FACULTIES)], 1 + group % 6, f"Г-{group}",
+               DAYS[(i // len(TIME_SLOTS)) % len(DAYS)], TIME_SLOTS[i % len(TIME_SLOTS)], SUBJECTS[i % len(SUBJECTS)])
+
+
+def synthetic_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(synthetic_rows(rows))
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+def run(label, tmp, filename, payload, rows):
+    pool = ConnectionPool(os.path.join(tmp, f"{label}.db"))
+    repo = ScheduleRepository(pool, DAYS, TIME_SLOTS)
+    repo.migrate()
+    importer = ScheduleImporter(repo, FACULTIES, COURSES)
+    started = time.perf_counter()
+    result = importer.import_file(filename, payload)
+    elapsed = time.perf_counter() - started
+    pool.close()
+    print(f"{label:<5} {len(payload) / 1e6:>6.1f} MB  {result['imported']} rows, {result['groups_created']} groups "
+          f"in {elapsed:.2f} s = {rows / elapsed:>8.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость импорта расписания из CSV и XLSX")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        run("csv", tmp, "bench.csv", synthetic_csv(args.rows), args.rows)
+        payload, _ = write_xlsx(synthetic_rows(args.rows))
+        run("xlsx", tmp, "bench.xlsx", payload, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from keyboards import KeyboardRegistry, create_inline_keyboard, create_reply_keyboard
+
+FACULTIES = ["ИЭИС", "ИЦЭУС", "ПИ", "ИБХИ", "ИГУМ", "ИМО", "ИЮР", "ИПТ", "ПТИ"]
+COURSES = ["1", "2", "3", "4", "5", "6"]
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+GROUPS = [f"ПИ-{course}{n:02d}" for course in range(1, 5) for n in range(1, 7)]
+
+
+def rebuild_per_update():
+    create_reply_keyboard(FACULTIES, columns=3)
+    create_reply_keyboard(COURSES, columns=3, add_back=True)
+    create_reply_keyboard([], columns=1, add_back=True, add_add_group=True)
+    create_inline_keyboard(GROUPS, columns=3)
+    create_reply_keyboard(DAYS, columns=2, add_back=True)
+
+
+def registry_per_update(registry):
+    registry.faculties
+    registry.courses
+    registry.group_actions
+    registry.groups(GROUPS)
+    registry.days
+
+
+def measure(label, func, updates):
+    started = time.perf_counter()
+    for _ in range(updates):
+        func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(100):
+        func()
+    allocated = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    print(f"{label:<22} {elapsed * 1e6 / updates:>8.1f} us/update  peak alloc per 100 updates: {allocated / 1024:.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Стоимость построения клавиатур на одно обновление")
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+    registry = KeyboardRegistry(FACULTIES, COURSES, DAYS, ["📗 Excel", "📄 CSV"])
+    measure("rebuild every update", rebuild_per_update, args.updates)
+    measure("keyboard registry", lambda: registry_per_update(registry), args.updates)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from telegram import Update  # noqa: E402
+
+from fake_bot_api import FakeBotAPI, callback_update, text_update  # noqa: E402
+
+FACULTIES = ["ИЭИС", "ИЦЭУС", "ПИ", "ИБХИ", "ИГУМ", "ИМО", "ИЮР", "ИПТ", "ПТИ"]
+DAY = "Среда"
+SCHEDULE_TEXT = "8:00 - Математика\n9:30-11:00 Физика\n12 - История\n14.15 — Программирование"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def user_script(user: int) -> list:
+    # (шаг, обновление без update_id, сколько ответов бота ждать)
+    faculty = FACULTIES[user % len(FACULTIES)]
+    course = str(1 + user // len(FACULTIES) % 6)
+    return [
+        ("start", ("text", "/start"), 1),
+        ("faculty", ("text", faculty), 1),
+        ("course", ("text", course), 2),
+        ("group", ("callback", f"LT-{user}"), 1),
+        ("day", ("text", DAY), 1),
+        ("enter_schedule", ("text", SCHEDULE_TEXT), 2),
+        ("export_prompt", ("text", "📊 Вывести расписание дня"), 1),
+        ("export_day", ("text", DAY), 1),
+        ("export", ("text", "📄 CSV"), 2),
+        ("done", ("text", "✅ Завершить"), 1),
+    ]
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(latencies: list) -> dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_user(application, fake, user: int, start_at: float, update_ids, latencies: dict, timeout: float):
+    await asyncio.sleep(start_at)
+    chat_id = 100_000 + user
+    expected = 0
+    for step, (kind, payload), replies in user_script(user):
+        update_id = next(update_ids)
+        if kind == "text":
+            data = text_update(update_id, chat_id, payload)
+        else:
+            data = callback_update(update_id, chat_id, payload)
+        expected += replies
+        started = time.perf_counter()
+        await application.update_queue.put(Update.de_json(data, application.bot))
+        await fake.wait_for_chat(chat_id, expected, timeout)
+        latencies.setdefault(step, []).append(time.perf_counter() - started)
+
+
+async def run_load(case2, args) -> dict:
+    fake = FakeBotAPI(latency=args.api_latency)
+    await fake.start()
+    persistence = None if args.no_persistence else case2.build_persistence()
+    application = case2.build_application(token="123:LOAD", base_url=fake.base_url, webhook=True,
+                                          concurrent_updates=args.concurrency, persistence=persistence)
+    update_ids = iter(range(1, 10 ** 9))
+    latencies = {}
+    failures = 0
+    async with application:
+        await application.start()
+        rss_before = rss_mb()
+        started = time.perf_counter()
+        tasks = [
+            asyncio.create_task(run_user(application, fake, user, user * args.ramp_up / args.users, update_ids,
+                                         latencies, args.timeout))
+            for user in range(args.users)
+        ]
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, BaseException):
+                failures += 1
+        elapsed = time.perf_counter() - started
+        rss_after = rss_mb()
+        await application.stop()
+    await fake.stop()
+    updates = sum(len(values) for values in latencies.values())
+    return {
+        "updates": updates,
+        "failed_users": failures,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_updates_per_s": round(updates / elapsed, 1),
+        "latency": summarize([value for values in latencies.values() for value in values]),
+        "steps": {step: summarize(values) for step, values in latencies.items()},
+        "memory": {
+            "rss_before_mb": round(rss_before, 1),
+            "rss_after_mb": round(rss_after, 1),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 / 1e6, 1),
+        },
+        "api_calls": dict(fake.calls),
+    }
+
+
+def compare(result: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    print(f"сравнение с {baseline_path} ({baseline.get('revision')}):")
+    rows = [("throughput_updates_per_s", result["throughput_updates_per_s"], baseline["throughput_updates_per_s"])]
+    rows += [(f"latency.{key}", result["latency"][key], baseline["latency"][key]) for key in ("p50_ms", "p99_ms")]
+    rows += [("memory.max_rss_mb", result["memory"]["max_rss_mb"], baseline["memory"]["max_rss_mb"])]
+    for name, current, previous in rows:
+        change = (current - previous) / previous * 100 if previous else 0.0
+        print(f"  {name:<28} {previous:>10} -> {current:>10} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный прогон полного диалога редактора против фейкового Bot API"
+    )
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="за сколько секунд подключаются все пользователи")
+    parser.add_argument("--api-latency", type=float, default=0.01, help="задержка фейкового Bot API, с")
+    parser.add_argument("--timeout", type=float, default=120.0, help="ожидание ответа на шаг, с")
+    parser.add_argument("--no-persistence", action="store_true")
+    parser.add_argument("--output", help="куда сохранить JSON (по умолчанию benchmarks/results/)")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SCHEDULE_DB"] = os.path.join(tmp, "load.db")
+        import case2
+        logging.getLogger().setLevel(logging.WARNING)
+        case2.init_db()
+        for user in range(args.users):
+            case2.repository.add_group(FACULTIES[user % len(FACULTIES)], 1 + user // len(FACULTIES) % 6, f"LT-{user}")
+        result = asyncio.run(run_load(case2, args))
+        case2.export_engine.shutdown()
+        case2.db_executor.shutdown()
+        case2.db_pool.close()
+    revision = git_revision()
+    result = {
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        **result,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{revision}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump(result, output_file, ensure_ascii=False, indent=2)
+    print(json.dumps({key: result[key] for key in ("updates", "failed_users", "throughput_updates_per_s",
+                                                   "latency", "memory")}, ensure_ascii=False, indent=2))
+    print(f"результат сохранен в {output}")
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
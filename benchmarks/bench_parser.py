@@ -0,0 +1,87 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from schedule_parser import parse_schedule_text  # noqa: E402
+
+TIME_SLOTS = [f"с {h}:00 до {h+1}:00" for h in range(6, 21)]
+SUBJECTS = ["Математика", "Физика", "История", "Философия", "Программирование", "Английский язык"]
+
+
+def legacy_parse(text):
+    entries = []
+    errors = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        parts = line.split('-', 1)
+        if len(parts) != 2:
+            errors.append(f"Неверный формат строки: {line}")
+            continue
+        time_str = parts[0].strip()
+        subject = parts[1].strip()
+        try:
+            hour = int(time_str.split(':')[0])
+        except ValueError:
+            errors.append(f"Неверный формат времени: {time_str}")
+            continue
+        time_slot = f"с {hour}:00 до {hour+1}:00"
+        if time_slot not in TIME_SLOTS:
+            errors.append(f"Неверное время: {time_str}")
+            continue
+        entries.append((time_slot, subject))
+    return entries, errors
+
+
+def synthetic_messages(count, lines):
+    rnd = random.Random(12)
+    messages = []
+    for _ in range(count):
+        hours = rnd.sample(range(6, 20), lines)
+        messages.append("\n".join(f"{hour}:00 - {rnd.choice(SUBJECTS)}" for hour in hours))
+    return messages
+
+
+def timed(label, messages, parse):
+    started = time.perf_counter()
+    for message in messages:
+        parse(message)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {len(messages) / elapsed:>10.0f} messages/s")
+
+
+def timed_sort(label, keys, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        sorted(keys)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {len(keys) * repeats / elapsed:>10.0f} keys/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Разбор расписания: split и поиск в списке против скомпилированного regex")
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--lines", type=int, default=6)
+    args = parser.parse_args()
+    messages = synthetic_messages(args.messages, args.lines)
+    timed("split + TIME_SLOTS lookup", messages, legacy_parse)
+    timed("compiled regex", messages, parse_schedule_text)
+
+    rnd = random.Random(3)
+    starts = [rnd.randrange(6, 21) * 60 for _ in range(100_000)]
+    timed_sort("sort by label string", [f"с {start // 60}:00 до {start // 60 + 1}:00" for start in starts], 20)
+    timed_sort("sort by start minutes", starts, 20)
+
+    legacy_order = [slot for slot, _ in sorted(legacy_parse(messages[0])[0])]
+    minutes_order = [start for start, _, _ in parse_schedule_text(messages[0])[0]]
+    print("строки (старый порядок):", ", ".join(slot.split()[1] for slot in legacy_order))
+    print("минуты (новый порядок): ", ", ".join(f"{start // 60}:{start % 60:02d}" for start in minutes_order))
+
+
+if __name__ == "__main__":
+    main()
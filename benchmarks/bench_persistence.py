@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from persistence import SqlitePersistence
+from storage import ConnectionPool, DatabaseExecutor, ScheduleRepository
+
+FACULTIES = ["ИЭИС", "ИЦЭУС", "ПИ", "ИБХИ", "ИГУМ", "ИМО", "ИЮР", "ИПТ", "ПТИ"]
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+TIME_SLOTS = [f"с {h}:00 до {h+1}:00" for h in range(6, 21)]
+CONVERSATION = "schedule_editor"
+
+
+def make_persistence(pool, executor):
+    return SqlitePersistence(pool, executor, FACULTIES, DAYS,
+                             faculty_key="FACULTY", course_key="COURSE", group_key="GROUP", day_key="DAY")
+
+
+def session(user_id):
+    faculty = FACULTIES[user_id % len(FACULTIES)]
+    course = 1 + user_id % 6
+    return {"FACULTY": faculty, "COURSE": course, "GROUP": f"Г-{user_id % 300}", "DAY": DAYS[user_id % 6]}
+
+
+async def store(persistence, sessions):
+    started = time.perf_counter()
+    for user_id in range(sessions):
+        await persistence.update_user_data(user_id, session(user_id))
+        await persistence.update_conversation(CONVERSATION, (user_id, user_id), 5)
+    await persistence.flush()
+    return time.perf_counter() - started
+
+
+async def restore(persistence):
+    started = time.perf_counter()
+    user_data = await persistence.get_user_data()
+    conversations = await persistence.get_conversations(CONVERSATION)
+    return time.perf_counter() - started, user_data, conversations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сохранение и восстановление сессий диалогов")
+    parser.add_argument("--sessions", type=int, default=100_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        pool = ConnectionPool(db_name)
+        repo = ScheduleRepository(pool, DAYS, TIME_SLOTS)
+        repo.migrate()
+        with pool.connection() as conn:
+            conn.executemany(
+                "INSERT INTO groups (faculty, course, group_name) VALUES (?, ?, ?)",
+                [(faculty, course, f"Г-{i}") for faculty in FACULTIES for course in range(1, 7) for i in range(300)]
+            )
+        executor = DatabaseExecutor()
+        elapsed = asyncio.run(store(make_persistence(pool, executor), args.sessions))
+        print(f"batched flush of {args.sessions} sessions: {elapsed:.2f} s")
+        pool.close()
+        print(f"db size: {os.path.getsize(db_name) / 1e6:.1f} MB")
+        pool = ConnectionPool(db_name)
+        elapsed, user_data, conversations = asyncio.run(restore(make_persistence(pool, executor)))
+        print(f"restore {len(user_data)} sessions / {len(conversations)} conversation states: {elapsed * 1000:.0f} ms")
+        assert user_data[7] == session(7)
+        executor.shutdown()
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from storage import ConnectionPool, ScheduleRepository
+
+FACULTIES = ["ИЭИС", "ИЦЭУС", "ПИ", "ИБХИ", "ИГУМ", "ИМО", "ИЮР", "ИПТ", "ПТИ"]
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+TIME_SLOTS = [f"с {h}:00 до {h+1}:00" for h in range(6, 21)]
+SUBJECTS = ["Математика", "Физика", "История", "Философия", "Программирование", "Английский язык"]
+
+
+def build_legacy_db(db_name, rows):
+    groups_count = max(1, rows // (len(DAYS) * len(TIME_SLOTS)))
+    groups = [(FACULTIES[i % len(FACULTIES)], 1 + i % 6, f"Г-{i}") for i in range(groups_count)]
+    conn = sqlite3.connect(db_name)
+    conn.execute("""
+        CREATE TABLE groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            faculty TEXT NOT NULL,
+            course INTEGER NOT NULL,
+            group_name TEXT NOT NULL,
+            UNIQUE(faculty, course, group_name)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE schedule_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            faculty TEXT NOT NULL,
+            course INTEGER NOT NULL,
+            group_name TEXT NOT NULL,
+            day_of_week TEXT NOT NULL,
+            time_slot TEXT NOT NULL,
+            subject TEXT NOT NULL
+        )
+    """)
+    conn.executemany("INSERT INTO groups (faculty, course, group_name) VALUES (?, ?, ?)", groups)
+
+    def entries():
+        rnd = random.Random(42)
+        for i in range(rows):
+            faculty, course, group_name = groups[i % groups_count]
+            yield (faculty, course, group_name, DAYS[(i // groups_count) % len(DAYS)],
+                   TIME_SLOTS[(i // (groups_count * len(DAYS))) % len(TIME_SLOTS)], rnd.choice(SUBJECTS))
+
+    conn.executemany(
+        "INSERT INTO schedule_entries (faculty, course, group_name, day_of_week, time_slot, subject) VALUES (?, ?, ?, ?, ?, ?)",
+        entries()
+    )
+    conn.commit()
+    conn.close()
+    return groups
+
+
+def legacy_lookup(conn, faculty, course, group_name, day):
+    return conn.execute(
+        "SELECT faculty, course, group_name, day_of_week, time_slot, subject FROM schedule_entries "
+        "WHERE faculty = ? AND course = ? AND group_name = ? AND day_of_week = ? "
+        "ORDER BY faculty, course, group_name, day_of_week, time_slot",
+        (faculty, course, group_name, day)
+    ).fetchall()
+
+
+def timed(label, count, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    if count:
+        print(f"{label:<32} {elapsed * 1000 / count:>10.3f} ms/query")
+    else:
+        print(f"{label:<32} {elapsed:>10.2f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поиск по schedule_entries до и после миграции схемы")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        groups = timed(f"build legacy db ({args.rows} rows)", 0, lambda: build_legacy_db(db_name, args.rows))
+        rnd = random.Random(7)
+        lookups = [groups[rnd.randrange(len(groups))] + (rnd.choice(DAYS),) for _ in range(args.queries)]
+        legacy_queries = max(1, args.queries // 20)
+        conn = sqlite3.connect(db_name)
+        timed("legacy full-scan lookup", legacy_queries,
+              lambda: [legacy_lookup(conn, *key) for key in lookups[:legacy_queries]])
+        conn.close()
+        pool = ConnectionPool(db_name)
+        repo = ScheduleRepository(pool, DAYS, TIME_SLOTS)
+        timed("migrate in place", 0, repo.migrate)
+        timed("indexed lookup", args.queries,
+              lambda: [repo.get_schedule_data(*key) for key in lookups])
+        timed("indexed whole-day export", 1, lambda: repo.get_schedule_data(day=DAYS[0]))
+        pool.close()
+        print(f"db size after migration: {os.path.getsize(db_name) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
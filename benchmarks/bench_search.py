@@ -0,0 +1,127 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import storage  # noqa: E402
+from search import SEARCH_TOKEN_RE  # noqa: E402
+from storage import ConnectionPool, ScheduleRepository  # noqa: E402
+
+FACULTIES = ["ИЭИС", "ИЦЭУС", "ПИ", "ИБХИ", "ИГУМ", "ИМО", "ИЮР", "ИПТ", "ПТИ"]
+DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+ADJECTIVES = ["Высшая", "Прикладная", "Общая", "Теоретическая", "Вычислительная", "Органическая", "Аналитическая",
+              "Дискретная", "Экспериментальная", "Квантовая", "Инженерная", "Начертательная", "Компьютерная"]
+NOUNS = ["математика", "физика", "химия", "механика", "геометрия", "информатика", "экономика", "биология",
+         "статистика", "лингвистика", "графика", "электроника", "оптика", "логика", "культурология"]
+SUFFIXES = ["", " (лекция)", " (практика)", " (лабораторная)", " и моделирование", " систем", " материалов"]
+PER_DAY = 10
+
+
+def subjects() -> list:
+    return [f"{adjective} {noun}{suffix}" for adjective in ADJECTIVES for noun in NOUNS for suffix in SUFFIXES]
+
+
+def drop_search_index(conn):
+    # Схема как до миграции 8: бенчмарк меряет саму миграцию и цену триггеров на запись
+    for name, kind in conn.execute(
+        "SELECT name, type FROM sqlite_master WHERE type IN ('trigger', 'index') "
+        "AND (name LIKE '%fts%' OR name LIKE 'subjects%' OR name = 'idx_schedule_subject')"
+    ).fetchall():
+        conn.execute(f"DROP {kind.upper()} {name}")
+    conn.execute("DROP TABLE subjects_fts")
+    conn.execute("DROP TABLE groups_fts")
+    conn.execute("DROP TABLE subjects")
+
+
+def build_catalogue(repo, rows: int, rnd) -> int:
+    names = subjects()
+    groups = max(1, -(-rows // (len(DAYS) * PER_DAY)))
+    with repo.pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO groups (id, faculty, course, group_name) VALUES (?, ?, ?, ?)",
+            [(g + 1, FACULTIES[g % len(FACULTIES)], 1 + g % 6, f"{FACULTIES[g % len(FACULTIES)]}-{g}")
+             for g in range(groups)]
+        )
+        conn.executemany(
+            "INSERT INTO schedule_entries (group_id, day, start_min, end_min, subject) VALUES (?, ?, ?, ?, ?)",
+            ((i // (len(DAYS) * PER_DAY) % groups + 1, i // PER_DAY % len(DAYS), 480 + i % PER_DAY * 75,
+              540 + i % PER_DAY * 75, rnd.choice(names)) for i in range(rows))
+        )
+    return groups
+
+
+def like_search(repo, text: str, limit: int) -> int:
+    # Без индекса: подстрока по всем занятиям и группам
+    pattern = f"%{text}%"
+    with repo.pool.connection() as conn:
+        conn.execute("SELECT faculty, course, group_name FROM groups WHERE group_name LIKE ? LIMIT ?",
+                     (pattern, limit)).fetchall()
+        count = conn.execute("SELECT COUNT(*) FROM schedule_entries WHERE subject LIKE ?", (pattern,)).fetchone()[0]
+        conn.execute(
+            "SELECT g.faculty, g.course, g.group_name, e.day, e.start_min, e.end_min, e.subject "
+            "FROM schedule_entries e JOIN groups g ON g.id = e.group_id WHERE e.subject LIKE ? LIMIT ?",
+            (pattern, limit)
+        ).fetchall()
+    return count
+
+
+def timed_queries(label: str, queries: list, func):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        func(query)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"{label:<36} p50 {timings[len(timings) // 2] * 1000:>8.2f} ms  "
+          f"p95 {timings[int(len(timings) * 0.95)] * 1000:>8.2f} ms  max {timings[-1] * 1000:>8.2f} ms")
+
+
+def timed(label: str, func):
+    started = time.perf_counter()
+    result = func()
+    print(f"{label:<36} {(time.perf_counter() - started) * 1000:>9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поиск по предметам и группам на синтетическом каталоге")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--like-queries", type=int, default=20, help="запросов для медленного LIKE")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--write-rows", type=int, default=50_000, help="строк для замера цены триггеров")
+    args = parser.parse_args()
+    rnd = random.Random(20)
+    words = sorted({token for name in subjects() for token in SEARCH_TOKEN_RE.findall(name)})
+    queries = [rnd.choice(words)[:rnd.randint(2, 6)] for _ in range(args.queries)]
+    queries += [f"{rnd.choice(words)[:4]} {rnd.choice(words)[:3]}" for _ in range(args.queries // 4)]
+    queries += [f"{rnd.choice(FACULTIES)} {rnd.randrange(1000)}" for _ in range(args.queries // 4)]
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "search.db"))
+        repo = ScheduleRepository(pool, DAYS, [])
+        repo.migrate()
+        with pool.connection() as conn:
+            drop_search_index(conn)
+        groups = timed(f"build catalogue ({args.rows} rows)", lambda: build_catalogue(repo, args.rows, rnd))
+        print(f"групп: {groups}, разных предметов: {len(subjects())}")
+        writes = [(FACULTIES[i % len(FACULTIES)], 1, f"W-{i // 60}", DAYS[i // 10 % len(DAYS)], 480 + i % 10 * 75,
+                   540 + i % 10 * 75, rnd.choice(subjects())) for i in range(args.write_rows)]
+        timed(f"upsert {args.write_rows} rows, no index", lambda: repo.upsert_entries(writes))
+        timed_queries("LIKE '%text%'", queries[:args.like_queries], lambda text: like_search(repo, text, args.limit))
+
+        with pool.connection() as conn:
+            timed("migration 8: build FTS index", lambda: storage._migration_8(conn, repo))
+        writes = [(faculty, course, f"{group_name}-2", *rest) for faculty, course, group_name, *rest in writes]
+        timed(f"upsert {args.write_rows} rows, with index", lambda: repo.upsert_entries(writes))
+        timed_queries("FTS search", queries, lambda text: repo.search(text, args.limit, 5))
+        result = repo.search("мат выс", args.limit, 5)
+        print(f"пример 'мат выс': найдено {result['entry_count']}, первое: {result['entries'][:1]}")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# Токен только проходит проверку формата, в Telegram бенчмарк не ходит
+BENCH_TOKEN = "123456:" + "x" * 35
+
+# Модули, которые не должны загружаться при старте бота в режиме polling
+LAZY_MODULES = ("openpyxl", "aiohttp", "webhook")
+
+COMMANDS = {
+    "import case2": [sys.executable, "-c", "import case2"],
+    "config.py": [sys.executable, "config.py"],
+    "python -c pass": [sys.executable, "-c", "pass"],
+}
+
+
+def run_once(command: list, env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run(command, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def loaded_lazy_modules(env: dict) -> list:
+    code = f"import sys, case2; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return output.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время запуска бота и проверки конфигурации")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=500.0, help="допустимая медиана import case2, мс")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "SCHEDULE_DB": os.path.join(tmp, "startup.db"), "BOT_MODE": "polling",
+               "TELEGRAM_BOT_TOKEN": BENCH_TOKEN}
+        failed = False
+        medians = {}
+        for label, command in COMMANDS.items():
+            run_once(command, env)
+            timings = sorted(run_once(command, env) for _ in range(args.runs))
+            medians[label] = timings[len(timings) // 2] * 1000
+            print(f"{label:<16} median {medians[label]:>7.1f} ms  min {timings[0] * 1000:>7.1f} ms")
+        print(f"max RSS дочерних процессов: {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024:.1f} MB")
+        lazy = loaded_lazy_modules(env)
+        if lazy:
+            print(f"при старте загружены тяжелые модули: {', '.join(lazy)}")
+            failed = True
+        if medians["import case2"] > args.budget_ms:
+            print(f"import case2 дольше бюджета {args.budget_ms:.0f} ms")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
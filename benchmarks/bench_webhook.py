@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aiohttp import ClientSession
+
+from fake_bot_api import FakeBotAPI, text_update
+from webhook import serve_webhook
+
+SCRIPT = ["/start", "ПИ", "1", "/cancel"]
+WEBHOOK_PATH = "/telegram"
+
+
+async def post_update(session, url, update):
+    async with session.post(url, json=update) as response:
+        await response.read()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def replay(case2, args):
+    fake = FakeBotAPI(latency=args.api_latency)
+    await fake.start()
+    application = case2.build_application(token="123:TEST", base_url=fake.base_url, webhook=True,
+                                          concurrent_updates=args.concurrency)
+    port = free_port()
+    stop = asyncio.Event()
+    server = asyncio.create_task(serve_webhook(application, "127.0.0.1", port, WEBHOOK_PATH, stop_event=stop))
+    await asyncio.sleep(0.5)
+    updates = [
+        text_update(round_ * args.users * len(SCRIPT) + step * args.users + user, 10_000 + user, text)
+        for round_ in range(args.rounds)
+        for step, text in enumerate(SCRIPT)
+        for user in range(args.users)
+    ]
+    url = f"http://127.0.0.1:{port}{WEBHOOK_PATH}"
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        for start in range(0, len(updates), 100):
+            await asyncio.gather(*(post_update(session, url, update) for update in updates[start:start + 100]))
+    await fake.wait_for_messages(len(updates), timeout=300)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await server
+    await fake.stop()
+    replies = {}
+    for _, chat_id, _, text in fake.sent:
+        replies.setdefault(chat_id, []).append(text)
+    in_order = all(
+        texts[i].startswith("Привет") for texts in replies.values() for i in range(0, len(texts), len(SCRIPT))
+    )
+    print(f"concurrency={args.concurrency:<4} updates={len(updates):<6} {len(updates) / elapsed:>8.0f} updates/s "
+          f"per-user order preserved: {in_order}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон вебхука с фейковым Bot API")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--api-latency", type=float, default=0.02, help="задержка фейкового Bot API, с")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SCHEDULE_DB"] = os.path.join(tmp, "bench.db")
+        import case2
+        logging.getLogger().setLevel(logging.WARNING)
+        case2.init_db()
+        asyncio.run(replay(case2, args))
+        case2.export_engine.shutdown()
+        case2.db_executor.shutdown()
+        case2.db_pool.close()
+
+
+if __name__ == "__main__":
+    main()
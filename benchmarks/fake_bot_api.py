@@ -0,0 +1,145 @@
+import asyncio
+import json
+import time
+from collections import Counter, defaultdict
+
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Schedule", "username": "schedule_test_bot"}
+MESSAGE_METHODS = {"sendMessage", "sendDocument", "editMessageText"}
+
+
+def _decode(value):
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class FakeBotAPI:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.calls = Counter()
+        self.durations = defaultdict(list)
+        self.sent = []
+        self.sent_per_chat = Counter()
+        self._message_id = 1000
+        self._waiters = []
+        self._chat_waiters = defaultdict(list)
+        self._runner = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def wait_for_messages(self, count: int, timeout: float = 60.0):
+        if len(self.sent) >= count:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((count, future))
+        await asyncio.wait_for(future, timeout)
+
+    async def wait_for_chat(self, chat_id: int, count: int, timeout: float = 60.0):
+        if self.sent_per_chat[chat_id] >= count:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._chat_waiters[chat_id].append((count, future))
+        await asyncio.wait_for(future, timeout)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        started = time.perf_counter()
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = {key: _decode(value) for key, value in (await request.post()).items()}
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls[method] += 1
+        result = self._result(method, params)
+        self.durations[method].append(time.perf_counter() - started)
+        return web.json_response({"ok": True, "result": result})
+
+    def _result(self, method: str, params: dict):
+        if method == "getMe":
+            return BOT_USER
+        if method not in MESSAGE_METHODS:
+            return True
+        self._message_id += 1
+        chat_id = int(params.get("chat_id", 0))
+        message = {
+            "message_id": int(params.get("message_id", self._message_id)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+        if method == "sendDocument":
+            message["document"] = {"file_id": f"doc{self._message_id}", "file_unique_id": f"u{self._message_id}"}
+        self.sent.append((time.perf_counter(), chat_id, method, message["text"]))
+        self.sent_per_chat[chat_id] += 1
+        waiters = self._chat_waiters.get(chat_id)
+        if waiters:
+            sent = self.sent_per_chat[chat_id]
+            for waiter in list(waiters):
+                count, future = waiter
+                if sent >= count:
+                    if not future.done():
+                        future.set_result(None)
+                    waiters.remove(waiter)
+        for waiter in list(self._waiters):
+            count, future = waiter
+            if len(self.sent) >= count and not future.done():
+                future.set_result(None)
+                self._waiters.remove(waiter)
+        return message
+
+
+def text_update(update_id: int, user_id: int, text: str) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": user,
+        "text": text,
+    }
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": update_id, "message": message}
+
+
+def callback_update(update_id: int, user_id: int, data: str, message_id: int = 1) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "Выберите группу",
+            },
+        },
+    }
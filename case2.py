@@ -1,179 +1,250 @@
+import asyncio
 import logging
-import sqlite3
 import os
-import pandas as pd
-from telegram import Update, ReplyKeyboardMarkup, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardRemove
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from telegram import InlineQueryResultArticle, InputTextMessageContent, Update, ReplyKeyboardRemove
+from telegram.error import Forbidden, RetryAfter
 from telegram.ext import (
     Application,
     CommandHandler,
     ConversationHandler,
     CallbackQueryHandler,
+    InlineQueryHandler,
     MessageHandler,
     filters,
     ContextTypes,
 )
-import datetime
+from cache import LRUCache
+from config import (
+    BOT_MODE,
+    BOT_TIMEZONE,
+    CACHE_SYNC_INTERVAL,
+    CHANGES_RETENTION_HOURS,
+    CLUSTER_WORKERS,
+    CONCURRENT_UPDATES,
+    DB_NAME,
+    METRICS_LISTEN,
+    METRICS_PORT,
+    PERSISTENCE_FLUSH_INTERVAL,
+    PROFILE_DIR,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_SLOW_UPDATE_SECONDS,
+    PUSH_TIME,
+    TELEGRAM_API_URL,
+    TELEGRAM_BOT_TOKEN,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WORKER_BASE_PORT,
+    WORKER_INDEX,
+    validate as validate_config,
+)
+from conflicts import describe_conflict, split_conflicts
+from export import FILE_EXTENSIONS, FORMAT_CSV, FORMAT_XLSX, FORMAT_XLSX_BY_FACULTY, ExportEngine
+from importer import ScheduleImporter
+from keyboards import KeyboardRegistry
+from metrics import InstrumentedRequest, MetricsRegistry, SlowUpdateProfiler
+from persistence import SqlitePersistence
+from schedule_parser import format_entry, format_range, parse_schedule_text
+from search import describe_entry, describe_group
+from storage import ConnectionPool, DatabaseExecutor, ScheduleRepository
+from student import StudentScheduleCache
+from timetable import FORMAT_TEXT, FORMAT_XLSX as TIMETABLE_FORMAT_XLSX, TimetableBuilder
+from updates import PerUserUpdateProcessor
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
 )
 logger = logging.getLogger(__name__)
 
-TELEGRAM_BOT_TOKEN = "7580331808:AAHxGMkM7ypuJAqmzwt-J1u-_XqX_R5Oepw"
-DB_NAME = "schedule_bot_v2.db"
+PUSH_BATCH_SIZE = 25
+PUSH_BATCH_INTERVAL = 1.0
 FACULTIES = ["ИЭИС", "ИЦЭУС", "ПИ", "ИБХИ", "ИГУМ", "ИМО", "ИЮР", "ИПТ", "ПТИ"]
 COURSES = ["1", "2", "3", "4", "5", "6"]
 DAYS_OF_WEEK = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
 TIME_SLOTS = [f"с {h}:00 до {h+1}:00" for h in range(6, 21)]
 (SELECT_FACULTY, SELECT_COURSE, SELECT_GROUP, ADD_GROUP_PROMPT,
- SELECT_DAY, ENTER_SCHEDULE, POST_SAVE_OPTIONS, EXPORT_ASK_DAY) = range(8)
+ SELECT_DAY, ENTER_SCHEDULE, POST_SAVE_OPTIONS, EXPORT_ASK_DAY, EXPORT_ASK_FORMAT) = range(9)
 (CALLBACK_FACULTY, CALLBACK_COURSE, CALLBACK_GROUP, CALLBACK_DAY) = ("FACULTY", "COURSE", "GROUP", "DAY")
+DB_READ_WORKERS = 4
+CACHE_TTL_SECONDS = 600
+EXPORT_WORKERS = 2
+# Соединение есть у каждого потока, который ходит в базу: читатели, писатель, экспорт и еще одно на вложенное
+# чтение сборщика рассылки. Иначе длинные потоковые чтения разбирают пул и писатель ждет соединение до таймаута
+DB_POOL_SIZE = DB_READ_WORKERS + 1 + EXPORT_WORKERS + 1
+EXPORT_USE_PROCESSES = False
+IMPORT_MAX_FILE_SIZE = 20 * 1024 * 1024
+TELEGRAM_MESSAGE_LIMIT = 4096
+CONFLICT_REPORT_LIMIT = 50
+SKIPPED_LINES_LIMIT = 20
+SKIPPED_LINE_LENGTH = 150
+CACHE_SYNC_MAX_CHANGES = 1000
+CHANGES_TRIM_INTERVAL = 3600
+FIND_RESULT_LIMIT = 20
+FIND_GROUP_LIMIT = 10
+FIND_SUBJECT_LIMIT = 10
+INLINE_RESULT_LIMIT = 20
+INLINE_GROUP_LIMIT = 5
+INLINE_CACHE_TIME = 60
+EXPORT_FORMAT_BUTTONS = {
+    "📗 Excel": FORMAT_XLSX,
+    "📚 Excel (лист на факультет)": FORMAT_XLSX_BY_FACULTY,
+    "📄 CSV": FORMAT_CSV,
+}
+
+metrics = MetricsRegistry(profiler=SlowUpdateProfiler(
+    PROFILE_SLOW_UPDATE_SECONDS, PROFILE_SAMPLE_RATE, PROFILE_DIR
+) if PROFILE_SLOW_UPDATE_SECONDS else None)
+metrics_runner = None
+cache_sync_position = None
+db_pool = ConnectionPool(DB_NAME, size=DB_POOL_SIZE)
+repository = ScheduleRepository(db_pool, DAYS_OF_WEEK, TIME_SLOTS)
+db_executor = DatabaseExecutor(workers=DB_READ_WORKERS, observer=metrics.observe_query)
+groups_cache = LRUCache(maxsize=512, ttl=CACHE_TTL_SECONDS)
+day_schedule_cache = LRUCache(maxsize=4096, ttl=CACHE_TTL_SECONDS)
+keyboards = KeyboardRegistry(FACULTIES, COURSES, DAYS_OF_WEEK, list(EXPORT_FORMAT_BUTTONS))
+importer = ScheduleImporter(repository, FACULTIES, COURSES, write=db_executor.write_blocking)
+timetable = TimetableBuilder(repository)
+student_schedules = StudentScheduleCache(repository, ttl=CACHE_TTL_SECONDS)
+export_engine = ExportEngine(repository, workers=EXPORT_WORKERS, use_processes=EXPORT_USE_PROCESSES)
 
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS groups (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            faculty TEXT NOT NULL,
-            course INTEGER NOT NULL,
-            group_name TEXT NOT NULL,
-            UNIQUE(faculty, course, group_name)
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS schedule_entries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            faculty TEXT NOT NULL,
-            course INTEGER NOT NULL,
-            group_name TEXT NOT NULL,
-            day_of_week TEXT NOT NULL,
-            time_slot TEXT NOT NULL,
-            subject TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    conn.close()
-    logger.info(f"База данных {DB_NAME} инициализирована.")
-
-def add_group_db(faculty: str, course: int, group_name: str) -> bool:
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    version = repository.migrate()
+    logger.info("База данных %s инициализирована (схема v%s).", DB_NAME, version)
+
+async def add_group_db(faculty: str, course: int, group_name: str) -> bool:
     try:
-        cursor.execute(
-            "INSERT INTO groups (faculty, course, group_name) VALUES (?, ?, ?)",
-            (faculty, course, group_name)
-        )
-        conn.commit()
-        logger.info(f"Добавлена группа: {faculty}, Курс {course}, {group_name}")
+        await db_executor.write(repository.add_group, faculty, course, group_name)
+        logger.info("Добавлена группа: %s, Курс %s, %s", faculty, course, group_name)
         return True
     except sqlite3.IntegrityError:
-        logger.warning(f"Попытка добавить существующую группу: {faculty}, Курс {course}, {group_name}")
+        logger.warning("Попытка добавить существующую группу: %s, Курс %s, %s", faculty, course, group_name)
         return False
     finally:
-        conn.close()
-
-def get_groups_db(faculty: str, course: int) -> list:
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT group_name FROM groups WHERE faculty = ? AND course = ? ORDER BY group_name",
-        (faculty, course)
-    )
-    groups = [row[0] for row in cursor.fetchall()]
-    conn.close()
+        groups_cache.invalidate((faculty, course))
+
+async def get_groups_db(faculty: str, course: int) -> list:
+    key = (faculty, course)
+    groups = groups_cache.get(key)
+    if groups is None:
+        generation = groups_cache.generation
+        groups = await db_executor.run(repository.get_groups, faculty, course)
+        groups_cache.set(key, groups, generation)
     return groups
 
-def save_schedule_entry_db(faculty: str, course: int, group_name: str, day: str, time_slot: str, subject: str):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+async def delete_schedule_for_day_db(faculty: str, course: int, group_name: str, day: str):
     try:
-        cursor.execute(
-            "INSERT INTO schedule_entries (faculty, course, group_name, day_of_week, time_slot, subject) VALUES (?, ?, ?, ?, ?, ?)",
-            (faculty, course, group_name, day, time_slot, subject)
-        )
-        conn.commit()
-        logger.info(f"Сохранена запись: {faculty}, К{course}, {group_name}, {day}, {time_slot}, {subject}")
-    except Exception as e:
-        logger.error(f"Ошибка сохранения записи в БД: {e}")
+        await db_executor.write(repository.delete_day, faculty, course, group_name, day)
     finally:
-        conn.close()
-
-def delete_schedule_for_day_db(faculty: str, course: int, group_name: str, day: str):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
-        "DELETE FROM schedule_entries WHERE faculty = ? AND course = ? AND group_name = ? AND day_of_week = ?",
-        (faculty, course, group_name, day)
-    )
-    conn.commit()
-    conn.close()
-    logger.info(f"Удалены записи для {faculty}, К{course}, {group_name}, {day}")
-
-def get_schedule_data_db(faculty: str = None, course: int = None, group_name: str = None, day: str = None) -> list:
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    query = "SELECT faculty, course, group_name, day_of_week, time_slot, subject FROM schedule_entries"
-    conditions = []
-    params = []
-    if faculty:
-        conditions.append("faculty = ?")
-        params.append(faculty)
-    if course is not None:
-        conditions.append("course = ?")
-        params.append(course)
-    if group_name:
-        conditions.append("group_name = ?")
-        params.append(group_name)
-    if day:
-        conditions.append("day_of_week = ?")
-        params.append(day)
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    query += " ORDER BY faculty, course, group_name, day_of_week, time_slot"
-    cursor.execute(query, params)
-    data = cursor.fetchall()
-    conn.close()
-    return data
-
-def create_reply_keyboard(buttons: list, columns: int, one_time: bool = True, add_back: bool = False, add_add_group: bool = False, custom_buttons: list = None) -> ReplyKeyboardMarkup:
-    keyboard = []
-    row = []
-    for i, button_text in enumerate(buttons):
-        row.append(button_text)
-        if (i + 1) % columns == 0 or i == len(buttons) - 1:
-            keyboard.append(row)
-            row = []
-    if add_add_group:
-         keyboard.append(["➕ Добавить группу"])
-    if custom_buttons:
-        for btn_row in custom_buttons:
-             keyboard.append(btn_row)
-    if add_back:
-        keyboard.append(["⬅️ Назад"])
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=one_time)
-
-def create_inline_keyboard(buttons: list, columns: int) -> InlineKeyboardMarkup:
-    keyboard = []
-    row = []
-    for i, button_text in enumerate(buttons):
-        row.append(InlineKeyboardButton(button_text, callback_data=button_text))
-        if (i + 1) % columns == 0 or i == len(buttons) - 1:
-            keyboard.append(row)
-            row = []
-    return InlineKeyboardMarkup(keyboard)
-
-def time_slot_to_start_time(time_slot: str) -> str:
-    parts = time_slot.split()
-    if len(parts) >= 2:
-        return parts[1] 
-    return "?"
+        day_schedule_cache.invalidate((faculty, course, group_name, day))
+        timetable.invalidate_group(faculty, course, group_name)
+        student_schedules.invalidate_group(faculty, course, group_name)
+    logger.info("Удалены записи для %s, К%s, %s, %s", faculty, course, group_name, day)
+
+async def replace_schedule_for_day_db(faculty: str, course: int, group_name: str, day: str, entries: list) -> dict:
+    try:
+        changes = await db_executor.write(repository.replace_day, faculty, course, group_name, day, entries)
+    finally:
+        invalidate_group_caches(faculty, course, group_name, day)
+    logger.info("Расписание %s, К%s, %s, %s обновлено: добавлено %s, изменено %s, удалено %s", faculty, course,
+                group_name, day, changes["inserted"], changes["updated"], changes["deleted"])
+    return changes
+
+async def get_day_entries_db(faculty: str, course: int, group_name: str, day: str) -> list:
+    key = (faculty, course, group_name, day)
+    entries = day_schedule_cache.get(key)
+    if entries is None:
+        generation = day_schedule_cache.generation
+        entries = await db_executor.run(repository.get_day_entries, faculty, course, group_name, day)
+        day_schedule_cache.set(key, entries, generation)
+    return entries
+
+async def get_schedule_data_db(faculty: str = None, course: int = None, group_name: str = None, day: str = None) -> list:
+    return await db_executor.run(repository.get_schedule_data, faculty=faculty, course=course, group_name=group_name, day=day)
+
+def invalidate_group_caches(faculty: str, course: int, group_name: str, day: str):
+    # Запись в расписание создает группу, если ее еще нет
+    groups_cache.invalidate((faculty, course))
+    day_schedule_cache.invalidate((faculty, course, group_name, day))
+    timetable.invalidate_group(faculty, course, group_name)
+    student_schedules.invalidate_group(faculty, course, group_name)
+
+async def get_timetable_db(output_format: str, faculty: str, course: int = None, group_name: str = None):
+    key = (output_format, faculty, course, group_name)
+    rendered = timetable.cache.get(key)
+    if rendered is None:
+        generation = timetable.cache.generation
+        rendered = await db_executor.run(timetable.render, output_format, faculty, course, group_name)
+        timetable.cache.set(key, rendered, generation)
+    return rendered
+
+async def get_group_schedule_db(faculty: str, course: int, group_name: str):
+    key = (faculty, course, group_name)
+    schedule = student_schedules.cache.get(key)
+    if schedule is None:
+        generation = student_schedules.cache.generation
+        schedule = await db_executor.run(student_schedules.build, faculty, course, group_name)
+        student_schedules.cache.set(key, schedule, generation)
+    return schedule
+
+def clear_caches():
+    groups_cache.clear()
+    day_schedule_cache.clear()
+    timetable.clear()
+    student_schedules.clear()
+
+async def sync_caches(context: ContextTypes.DEFAULT_TYPE) -> None:
+    # Другие воркеры пишут в ту же базу: по журналу изменений сбрасываются устаревшие записи кэшей
+    global cache_sync_position
+    position = await db_executor.run(repository.sync_position)
+    if cache_sync_position is None or position[0] - cache_sync_position[0] > CACHE_SYNC_MAX_CHANGES:
+        clear_caches()
+    else:
+        if position[1] != cache_sync_position[1]:
+            groups_cache.clear()
+        if position[0] != cache_sync_position[0]:
+            changes = await db_executor.run(repository.changes_since, cache_sync_position[0], CACHE_SYNC_MAX_CHANGES)
+            for _, faculty, course, group_name, day, *_ in changes:
+                if faculty is not None:
+                    invalidate_group_caches(faculty, course, group_name, day)
+    cache_sync_position = position
+
+async def trim_change_log(context: ContextTypes.DEFAULT_TYPE) -> None:
+    older_than = int(datetime.now().timestamp() - CHANGES_RETENTION_HOURS * 3600)
+    removed = await db_executor.write(repository.trim_changes, older_than)
+    if removed:
+        logger.info("Из журнала изменений удалено записей: %s", removed)
+
+def cache_stats() -> dict:
+    return {"groups": groups_cache.stats(), "day_schedule": day_schedule_cache.stats(),
+            "timetable": timetable.cache.stats(), "student": student_schedules.cache.stats()}
+
+def cache_metrics():
+    for name, stats in cache_stats().items():
+        for key, value in stats.items():
+            yield f"cache_{key}", {"cache": name}, value
+
+metrics.add_collector(cache_metrics)
+
+async def start_metrics(application: Application) -> None:
+    from webhook import start_metrics_server
+
+    global metrics_runner
+    metrics_runner = await start_metrics_server(metrics, METRICS_LISTEN, METRICS_PORT)
+
+async def stop_metrics(application: Application) -> None:
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
     context.user_data.clear()
-    logger.info(f"Пользователь {user.username} ({user.id}) запустил бота.")
-    reply_markup = create_reply_keyboard(FACULTIES, columns=3)
+    logger.info("Пользователь %s (%s) запустил бота.", user.username, user.id)
+    reply_markup = keyboards.faculties
     await update.message.reply_text(
         f"Привет, {user.first_name}! 👋\n"
         "Я помогу тебе внести данные для расписания.\n\n"
@@ -188,8 +259,8 @@ async def select_faculty(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text("Пожалуйста, выберите факультет из предложенных кнопок.")
         return SELECT_FACULTY
     context.user_data[CALLBACK_FACULTY] = faculty
-    logger.info(f"Пользователь {update.effective_user.id} выбрал факультет: {faculty}")
-    reply_markup = create_reply_keyboard(COURSES, columns=3, add_back=True)
+    logger.info("Пользователь %s выбрал факультет: %s", update.effective_user.id, faculty)
+    reply_markup = keyboards.courses
     await update.message.reply_text("Отлично! Теперь выберите курс:", reply_markup=reply_markup)
     return SELECT_COURSE
 
@@ -201,17 +272,17 @@ async def select_course(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     course = int(course_text)
     context.user_data[CALLBACK_COURSE] = course
     faculty = context.user_data[CALLBACK_FACULTY]
-    logger.info(f"Пользователь {update.effective_user.id} выбрал курс: {course} для факультета {faculty}")
+    logger.info("Пользователь %s выбрал курс: %s для факультета %s", update.effective_user.id, course, faculty)
     await send_group_selection(update, context)
     return SELECT_GROUP
 
 async def send_group_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, message_id_to_edit: int = None):
     faculty = context.user_data[CALLBACK_FACULTY]
     course = context.user_data[CALLBACK_COURSE]
-    groups = get_groups_db(faculty, course)
-    reply_markup_main = create_reply_keyboard([], columns=1, add_back=True, add_add_group=True)
+    groups = await get_groups_db(faculty, course)
+    reply_markup_main = keyboards.group_actions
     if groups:
-        inline_markup = create_inline_keyboard(groups, columns=3)
+        inline_markup = keyboards.groups(groups)
         message_text = f"Выберите группу для {faculty}, курс {course}:"
         if message_id_to_edit:
              try:
@@ -223,7 +294,7 @@ async def send_group_selection(update: Update, context: ContextTypes.DEFAULT_TYP
                   )
                   await update.message.reply_text("(Или добавьте новую / вернитесь назад)", reply_markup=reply_markup_main)
              except Exception as e:
-                  logger.error(f"Не удалось отредактировать сообщение выбора группы: {e}. Отправляю новое.")
+                  logger.error("Не удалось отредактировать сообщение выбора группы: %s. Отправляю новое.", e)
                   await update.message.reply_text(message_text, reply_markup=inline_markup)
                   await update.message.reply_text("(Или добавьте новую / вернитесь назад)", reply_markup=reply_markup_main)
         else:
@@ -240,9 +311,9 @@ async def select_group_inline(update: Update, context: ContextTypes.DEFAULT_TYPE
     context.user_data[CALLBACK_GROUP] = group_name
     faculty = context.user_data[CALLBACK_FACULTY]
     course = context.user_data[CALLBACK_COURSE]
-    logger.info(f"Пользователь {query.from_user.id} выбрал группу: {group_name} ({faculty}, {course})")
+    logger.info("Пользователь %s выбрал группу: %s (%s, %s)", query.from_user.id, group_name, faculty, course)
     await query.delete_message()
-    reply_markup = create_reply_keyboard(DAYS_OF_WEEK, columns=2, add_back=True)
+    reply_markup = keyboards.days
     await query.message.reply_text(
         f"Группа: {group_name}. Выберите день недели:",
         reply_markup=reply_markup
@@ -250,12 +321,12 @@ async def select_group_inline(update: Update, context: ContextTypes.DEFAULT_TYPE
     return SELECT_DAY
 
 async def prompt_add_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    logger.info(f"Пользователь {update.effective_user.id} нажал 'Добавить группу'.")
+    logger.info("Пользователь %s нажал 'Добавить группу'.", update.effective_user.id)
     try:
         context.user_data['group_select_message_id'] = update.message.message_id - 1
     except:
         context.user_data['group_select_message_id'] = None
-    await update.message.reply_text("Введите название новой группы:", reply_markup=ReplyKeyboardMarkup([["⬅️ Отмена добавления"]], resize_keyboard=True))
+    await update.message.reply_text("Введите название новой группы:", reply_markup=keyboards.cancel_add_group)
     return ADD_GROUP_PROMPT
 
 async def add_group_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -266,18 +337,18 @@ async def add_group_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return ADD_GROUP_PROMPT
     faculty = context.user_data[CALLBACK_FACULTY]
     course = context.user_data[CALLBACK_COURSE]
-    if add_group_db(faculty, course, new_group_name):
-        logger.info(f"Пользователь {user.id} успешно добавил группу: {new_group_name}")
+    if await add_group_db(faculty, course, new_group_name):
+        logger.info("Пользователь %s успешно добавил группу: %s", user.id, new_group_name)
         await update.message.reply_text(f"Группа '{new_group_name}' успешно добавлена!", reply_markup=ReplyKeyboardRemove())
     else:
-        logger.warning(f"Пользователь {user.id} пытался добавить существующую группу: {new_group_name}")
+        logger.warning("Пользователь %s пытался добавить существующую группу: %s", user.id, new_group_name)
         await update.message.reply_text(f"Группа '{new_group_name}' уже существует для этого курса и факультета.", reply_markup=ReplyKeyboardRemove())
     message_id_to_update = context.user_data.pop('group_select_message_id', None)
     await send_group_selection(update, context, message_id_to_edit=message_id_to_update)
     return SELECT_GROUP
 
 async def cancel_add_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    logger.info(f"Пользователь {update.effective_user.id} отменил добавление группы.")
+    logger.info("Пользователь %s отменил добавление группы.", update.effective_user.id)
     await update.message.reply_text("Добавление группы отменено.", reply_markup=ReplyKeyboardRemove())
     message_id_to_update = context.user_data.pop('group_select_message_id', None)
     await send_group_selection(update, context, message_id_to_edit=message_id_to_update)
@@ -292,24 +363,33 @@ async def select_day(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     faculty = context.user_data[CALLBACK_FACULTY]
     course = context.user_data[CALLBACK_COURSE]
     group_name = context.user_data[CALLBACK_GROUP]
-    logger.info(f"Пользователь {update.effective_user.id} выбрал день: {day} для группы {group_name}")
-    schedule_data = get_schedule_data_db(faculty=faculty, course=course, group_name=group_name, day=day)
-    if schedule_data:
-        schedule_text = f"Текущее расписание для {day}:\n"
-        for entry in schedule_data:
-            time_slot = entry[4]
-            subject = entry[5]
-            start_time = time_slot_to_start_time(time_slot)
-            schedule_text += f"{start_time} - {subject}\n"
-        message = schedule_text + "\nВведите новое расписание или 'нет' для удаления."
+    logger.info("Пользователь %s выбрал день: %s для группы %s", update.effective_user.id, day, group_name)
+    entries = await get_day_entries_db(faculty, course, group_name, day)
+    if entries:
+        schedule_text = "\n".join(format_entry(start, end, subject) for start, end, subject in entries)
+        message = f"Текущее расписание для {day}:\n{schedule_text}\n\nВведите новое расписание или 'нет' для удаления."
     else:
         message = f"Расписание для {day} отсутствует. Введите расписание или 'нет'."
     await update.message.reply_text(
         message,
-        reply_markup=ReplyKeyboardMarkup([["⬅️ Назад"]], resize_keyboard=True)
+        reply_markup=keyboards.back_only
     )
     return ENTER_SCHEDULE
 
+def limit_report_lines(lines: list, total: int = None) -> list:
+    # Ответ ограничен TELEGRAM_MESSAGE_LIMIT: первые строки, обрезанные до SKIPPED_LINE_LENGTH, и счетчик остальных
+    total = len(lines) if total is None else total
+    shown = [line if len(line) <= SKIPPED_LINE_LENGTH else line[:SKIPPED_LINE_LENGTH - 1] + "…"
+             for line in lines[:SKIPPED_LINES_LIMIT]]
+    if total > len(shown):
+        shown.append(f"... и еще {total - len(shown)}")
+    return shown
+
+def skipped_lines_text(errors: list) -> str:
+    if not errors:
+        return ""
+    return "Пропущены строки:\n" + "\n".join(limit_report_lines(errors)) + "\n\n"
+
 async def enter_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     text = update.message.text.strip()
     faculty = context.user_data[CALLBACK_FACULTY]
@@ -317,43 +397,35 @@ async def enter_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     group_name = context.user_data[CALLBACK_GROUP]
     day = context.user_data[CALLBACK_DAY]
     if text.lower() == 'нет':
-        delete_schedule_for_day_db(faculty, course, group_name, day)
+        await delete_schedule_for_day_db(faculty, course, group_name, day)
         await update.message.reply_text(f"Расписание для {day} удалено.")
     else:
-        delete_schedule_for_day_db(faculty, course, group_name, day)
-        lines = text.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line:
-                parts = line.split('-', 1)
-                if len(parts) == 2:
-                    time_str = parts[0].strip()
-                    subject = parts[1].strip()
-                    try:
-                        hour = int(time_str.split(':')[0])
-                        time_slot = f"с {hour}:00 до {hour+1}:00"
-                        if time_slot in TIME_SLOTS:
-                            save_schedule_entry_db(faculty, course, group_name, day, time_slot, subject)
-                        else:
-                            await update.message.reply_text(f"Неверное время: {time_str}. Пропускаю.")
-                    except ValueError:
-                        await update.message.reply_text(f"Неверный формат времени: {time_str}. Пропускаю.")
-                else:
-                    await update.message.reply_text(f"Неверный формат строки: {line}. Пропускаю.")
-        await update.message.reply_text(f"Расписание для {day} сохранено.")
-    final_options_keyboard = [
-        ["➕ Добавить еще запись"], [" EЯ Выбрать другую группу"],
-        ["📊 Вывести расписание дня"], ["✅ Завершить"]
-    ]
-    reply_markup = ReplyKeyboardMarkup(final_options_keyboard, resize_keyboard=True, one_time_keyboard=False)
-    await update.message.reply_text("Что делаем дальше?", reply_markup=reply_markup)
+        entries, errors = parse_schedule_text(text)
+        entries, conflicts = split_conflicts(entries)
+        errors.extend(f"Пересечение: {describe_conflict(first, second)}" for first, second in conflicts)
+        errors_text = skipped_lines_text(errors)
+        if not entries:
+            await update.message.reply_text(
+                errors_text + f"Нет корректных строк, расписание для {day} не изменено. "
+                "Введите расписание еще раз или 'нет' для удаления.",
+                reply_markup=keyboards.back_only
+            )
+            return ENTER_SCHEDULE
+        changes = await replace_schedule_for_day_db(faculty, course, group_name, day, entries)
+        if any(changes.values()):
+            summary = (f"добавлено {changes['inserted']}, изменено {changes['updated']}, "
+                       f"удалено {changes['deleted']}")
+            await update.message.reply_text(errors_text + f"Расписание для {day} сохранено ({summary}).")
+        else:
+            await update.message.reply_text(errors_text + f"Расписание для {day} не изменилось.")
+    await update.message.reply_text("Что делаем дальше?", reply_markup=keyboards.post_save_options)
     return POST_SAVE_OPTIONS
 
 async def add_another_entry(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     group_name = context.user_data.get(CALLBACK_GROUP, "текущая группа")
-    logger.info(f"Пользователь {update.effective_user.id} решил добавить еще запись для группы {group_name}.")
+    logger.info("Пользователь %s решил добавить еще запись для группы %s.", update.effective_user.id, group_name)
     context.user_data.pop(CALLBACK_DAY, None)
-    reply_markup = create_reply_keyboard(DAYS_OF_WEEK, columns=2, add_back=True)
+    reply_markup = keyboards.days
     await update.message.reply_text(
         f"Добавляем еще запись для группы {group_name}.\nВыберите день недели:",
         reply_markup=reply_markup
@@ -361,63 +433,124 @@ async def add_another_entry(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return SELECT_DAY
 
 async def go_to_group_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    logger.info(f"Пользователь {update.effective_user.id} решил выбрать другую группу.")
+    logger.info("Пользователь %s решил выбрать другую группу.", update.effective_user.id)
     context.user_data.pop(CALLBACK_GROUP, None)
     context.user_data.pop(CALLBACK_DAY, None)
     await send_group_selection(update, context)
     return SELECT_GROUP
 
 async def prompt_export_day(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    logger.info(f"Пользователь {update.effective_user.id} запросил экспорт за день.")
-    reply_markup = create_reply_keyboard(DAYS_OF_WEEK, columns=2, add_back=True)
+    logger.info("Пользователь %s запросил экспорт за день.", update.effective_user.id)
+    reply_markup = keyboards.days
     await update.message.reply_text("Выберите день недели для экспорта расписания:", reply_markup=reply_markup)
     return EXPORT_ASK_DAY
 
 async def export_day_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     day_to_export = update.message.text
-    user = update.effective_user
     if day_to_export not in DAYS_OF_WEEK:
         await update.message.reply_text("Пожалуйста, выберите день из кнопок.")
         return EXPORT_ASK_DAY
-    logger.info(f"Пользователь {user.id} экспортирует расписание за {day_to_export}.")
-    schedule_data = get_schedule_data_db(day_filter=day_to_export)
-    if not schedule_data:
-        await update.message.reply_text(f"Нет записей расписания для '{day_to_export}'.")
-        final_options_keyboard = [
-            ["➕ Добавить еще запись"], [" EЯ Выбрать другую группу"],
-            ["📊 Вывести расписание дня"], ["✅ Завершить"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(final_options_keyboard, resize_keyboard=True, one_time_keyboard=False)
-        await update.message.reply_text("Что делаем дальше?", reply_markup=reply_markup)
+    context.user_data['export_day'] = day_to_export
+    reply_markup = keyboards.export_formats
+    await update.message.reply_text("Выберите формат файла:", reply_markup=reply_markup)
+    return EXPORT_ASK_FORMAT
+
+async def export_day_in_format(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    export_format = EXPORT_FORMAT_BUTTONS.get(update.message.text)
+    day_to_export = context.user_data.get('export_day')
+    user = update.effective_user
+    if export_format is None or day_to_export is None:
+        await update.message.reply_text("Пожалуйста, выберите формат из кнопок.")
+        return EXPORT_ASK_FORMAT
+    logger.info("Пользователь %s экспортирует расписание за %s (%s).", user.id, day_to_export, export_format)
+    try:
+        payload, row_count = await export_engine.export(export_format, day=day_to_export)
+        if row_count:
+            await update.message.reply_document(
+                document=payload,
+                filename=f"Расписание_{day_to_export}.{FILE_EXTENSIONS[export_format]}",
+                caption=f"Вот расписание для '{day_to_export}' ({row_count} записей)."
+            )
+        else:
+            await update.message.reply_text(f"Нет записей расписания для '{day_to_export}'.")
+    except Exception as e:
+        logger.error("Ошибка при создании или отправке файла для дня %s: %s", day_to_export, e)
+        await update.message.reply_text("Произошла ошибка при создании файла. Попробуйте позже.")
+    context.user_data.pop('export_day', None)
+    await update.message.reply_text("Что делаем дальше?", reply_markup=keyboards.post_save_options)
+    return POST_SAVE_OPTIONS
+
+async def show_group_week(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    faculty = context.user_data[CALLBACK_FACULTY]
+    course = context.user_data[CALLBACK_COURSE]
+    group_name = context.user_data.get(CALLBACK_GROUP)
+    if group_name is None:
+        await update.message.reply_text("Сначала выберите группу.")
         return POST_SAVE_OPTIONS
+    logger.info("Пользователь %s запросил неделю группы %s.", update.effective_user.id, group_name)
+    text = await get_timetable_db(FORMAT_TEXT, faculty, course, group_name)
+    if not text:
+        await update.message.reply_text(f"Для группы {group_name} расписание на неделю пустое.")
+        return POST_SAVE_OPTIONS
+    await update.message.reply_text(text[:TELEGRAM_MESSAGE_LIMIT])
     try:
-        df = pd.DataFrame(schedule_data, columns=['Факультет', 'Курс', 'Группа', 'День', 'Время', 'Предмет'])
-        df_sorted = df.sort_values(by=['Группа', 'Время'])
-        current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        excel_filename = f"schedule_{day_to_export}_{user.id}_{current_date}.xlsx"
-        df_sorted.to_excel(excel_filename, index=False, engine='openpyxl')
-        logger.info(f"Excel файл {excel_filename} создан.")
+        payload = await get_timetable_db(TIMETABLE_FORMAT_XLSX, faculty, course, group_name)
         await update.message.reply_document(
-            document=open(excel_filename, 'rb'),
-            filename=f"Расписание_{day_to_export}.xlsx",
-            caption=f"Вот расписание для '{day_to_export}' в формате Excel."
+            document=payload,
+            filename=f"Расписание_{group_name}.xlsx",
+            caption=f"Неделя группы {group_name}.",
+            reply_markup=keyboards.post_save_options,
         )
-        os.remove(excel_filename)
-        logger.info(f"Excel файл {excel_filename} удален.")
     except Exception as e:
-        logger.error(f"Ошибка при создании или отправке Excel файла для дня {day_to_export}: {e}")
-        await update.message.reply_text("Произошла ошибка при создании Excel файла. Попробуйте позже.")
-    final_options_keyboard = [
-        ["➕ Добавить еще запись"], [" EЯ Выбрать другую группу"],
-        ["📊 Вывести расписание дня"], ["✅ Завершить"]
-    ]
-    reply_markup = ReplyKeyboardMarkup(final_options_keyboard, resize_keyboard=True, one_time_keyboard=False)
-    await update.message.reply_text("Что делаем дальше?", reply_markup=reply_markup)
+        logger.error("Ошибка при экспорте недели группы %s: %s", group_name, e)
+        await update.message.reply_text("Произошла ошибка при создании файла. Попробуйте позже.",
+                                        reply_markup=keyboards.post_save_options)
+    return POST_SAVE_OPTIONS
+
+async def export_faculty_week(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    faculty = context.user_data[CALLBACK_FACULTY]
+    logger.info("Пользователь %s экспортирует неделю факультета %s.", update.effective_user.id, faculty)
+    try:
+        payload = await get_timetable_db(TIMETABLE_FORMAT_XLSX, faculty)
+        await update.message.reply_document(
+            document=payload,
+            filename=f"Расписание_{faculty}_неделя.xlsx",
+            caption=f"Расписание {faculty} на неделю: лист на каждую группу.",
+            reply_markup=keyboards.post_save_options,
+        )
+    except Exception as e:
+        logger.error("Ошибка при экспорте недели факультета %s: %s", faculty, e)
+        await update.message.reply_text("Произошла ошибка при создании файла. Попробуйте позже.",
+                                        reply_markup=keyboards.post_save_options)
     return POST_SAVE_OPTIONS
 
+async def import_schedule_document(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    document = update.message.document
+    user = update.effective_user
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        await update.message.reply_text("Файл слишком большой для импорта.")
+        return
+    logger.info("Пользователь %s импортирует файл %s.", user.id, document.file_name)
+    await update.message.reply_text(f"Импортирую '{document.file_name}'...")
+    try:
+        telegram_file = await document.get_file()
+        payload = bytes(await telegram_file.download_as_bytearray())
+        result = await db_executor.run(importer.import_file, document.file_name, payload)
+    except Exception as e:
+        logger.error("Ошибка импорта файла %s: %s", document.file_name, e)
+        await update.message.reply_text("Не удалось прочитать файл. Проверьте формат и столбцы.")
+        return
+    finally:
+        clear_caches()
+    message = (f"Импорт завершен.\nСтрок: {result['rows']}, сохранено: {result['imported']}, "
+               f"новых групп: {result['groups_created']}, ошибок: {result['error_count']}.")
+    if result["errors"]:
+        message += "\n\n" + "\n".join(limit_report_lines(result["errors"], result["error_count"]))
+    await update.message.reply_text(message)
+
 async def back_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
-    logger.info(f"Пользователь {user.id} нажал Назад.")
+    logger.info("Пользователь %s нажал Назад.", user.id)
     current_data = context.user_data
     if CALLBACK_DAY in current_data:
         del current_data[CALLBACK_DAY]
@@ -427,13 +560,13 @@ async def back_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     elif CALLBACK_GROUP in current_data:
         del current_data[CALLBACK_GROUP]
         logger.debug("Возврат к выбору курса")
-        reply_markup = create_reply_keyboard(COURSES, columns=3, add_back=True)
+        reply_markup = keyboards.courses
         await update.message.reply_text("Выберите курс:", reply_markup=reply_markup)
         return SELECT_COURSE
     elif CALLBACK_COURSE in current_data:
         del current_data[CALLBACK_COURSE]
         logger.debug("Возврат к выбору факультета")
-        reply_markup = create_reply_keyboard(FACULTIES, columns=3)
+        reply_markup = keyboards.faculties
         await update.message.reply_text("Выберите институт/факультет:", reply_markup=reply_markup)
         return SELECT_FACULTY
     elif CALLBACK_FACULTY in current_data:
@@ -444,9 +577,207 @@ async def back_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
         logger.debug("Некуда возвращаться, переход в начало")
         return await start(update, context)
 
+async def remind_group_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    await update.message.reply_text("Используйте кнопки для выбора или добавления группы.")
+    return SELECT_GROUP
+
+async def remind_option_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    await update.message.reply_text("Используйте предложенные кнопки.")
+    return POST_SAVE_OPTIONS
+
+async def back_to_post_save_options(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    await update.message.reply_text("Что делаем дальше?", reply_markup=keyboards.post_save_options)
+    return POST_SAVE_OPTIONS
+
+async def report_conflicts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    count, conflicts = await db_executor.run(repository.conflict_report, CONFLICT_REPORT_LIMIT)
+    logger.info("Пользователь %s запросил отчет о пересечениях: %s", update.effective_user.id, count)
+    if not count:
+        await update.message.reply_text("Пересечений в расписании не найдено.")
+        return
+    lines = [f"Найдено пересечений: {count}"]
+    lines.extend(
+        f"{group_name} ({faculty}, курс {course}), {day}: {describe_conflict(first, second)}"
+        for (faculty, course, group_name), day, first, second in conflicts
+    )
+    if count > len(conflicts):
+        lines.append(f"... и еще {count - len(conflicts)}")
+    await update.message.reply_text("\n".join(lines)[:TELEGRAM_MESSAGE_LIMIT])
+
+async def subscribe(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = update.effective_user
+    if context.args:
+        group_name = " ".join(context.args)
+        matches = await db_executor.run(repository.find_groups_by_name, group_name)
+        if len(matches) != 1:
+            await update.message.reply_text(
+                f"Группа '{group_name}' не найдена." if not matches else
+                f"Группа '{group_name}' есть на нескольких факультетах или курсах. "
+                "Выберите ее через /start и отправьте /subscribe."
+            )
+            return
+        faculty, course, group_name = matches[0]
+    else:
+        faculty = context.user_data.get(CALLBACK_FACULTY)
+        course = context.user_data.get(CALLBACK_COURSE)
+        group_name = context.user_data.get(CALLBACK_GROUP)
+        if not (faculty and course and group_name):
+            await update.message.reply_text(
+                "Укажите группу: /subscribe <группа>, или выберите ее через /start и отправьте /subscribe."
+            )
+            return
+    saved = await db_executor.write(
+        repository.set_subscription, user.id, update.effective_chat.id, faculty, course, group_name
+    )
+    if not saved:
+        await update.message.reply_text(f"Группа '{group_name}' не найдена.")
+        return
+    logger.info("Пользователь %s подписался на группу %s (%s, %s)", user.id, group_name, faculty, course)
+    await update.message.reply_text(
+        f"Ваша группа: {group_name} ({faculty}, курс {course}).\n"
+        f"Каждое утро в {PUSH_TIME:%H:%M} пришлю расписание на день. "
+        "Команды: /today, /tomorrow, /week, /unsubscribe."
+    )
+
+async def unsubscribe(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await db_executor.write(repository.set_notify, [update.effective_user.id], False)
+    await update.message.reply_text("Ежедневная рассылка отключена. /today и /week продолжат работать.")
+
+async def student_schedule(update: Update):
+    subscription = await db_executor.run(repository.get_subscription, update.effective_user.id)
+    if subscription is None:
+        await update.message.reply_text("Группа не выбрана. Отправьте /subscribe <группа>.")
+        return None
+    faculty, course, group_name, _ = subscription
+    return await get_group_schedule_db(faculty, course, group_name)
+
+async def send_student_day(update: Update, offset: int, label: str):
+    schedule = await student_schedule(update)
+    if schedule is None:
+        return
+    day_index = (datetime.now(BOT_TIMEZONE).weekday() + offset) % 7
+    if day_index >= len(DAYS_OF_WEEK):
+        await update.message.reply_text(f"{label} воскресенье, занятий нет.")
+        return
+    await update.message.reply_text(schedule.day_texts[day_index])
+
+async def show_today(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await send_student_day(update, 0, "Сегодня")
+
+async def show_tomorrow(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await send_student_day(update, 1, "Завтра")
+
+async def show_week(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    schedule = await student_schedule(update)
+    if schedule is not None:
+        await update.message.reply_text(schedule.week_text[:TELEGRAM_MESSAGE_LIMIT])
+
+async def find_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    text = " ".join(context.args)
+    if not text:
+        await update.message.reply_text("Укажите, что искать: /find <предмет или группа>")
+        return
+    result = await db_executor.run(repository.search, text, FIND_RESULT_LIMIT, FIND_GROUP_LIMIT)
+    groups, subjects, entries, count = result["groups"], result["subjects"], result["entries"], result["entry_count"]
+    logger.info("Пользователь %s искал '%s': групп %s, занятий %s", update.effective_user.id, text, len(groups), count)
+    if not groups and not count:
+        await update.message.reply_text(f"По запросу '{text}' ничего не найдено.")
+        return
+    lines = []
+    if groups:
+        lines.append("Группы:")
+        lines.extend(f"  {describe_group(*group)}" for group in groups)
+    if count:
+        if lines:
+            lines.append("")
+        names = ", ".join(f"{name} ({uses})" for name, uses in subjects[:FIND_SUBJECT_LIMIT])
+        if len(subjects) > FIND_SUBJECT_LIMIT:
+            names += f" и еще {len(subjects) - FIND_SUBJECT_LIMIT}"
+        lines.append(f"Предметы: {names}")
+        lines.append(f"Занятия ({count}):")
+        lines.extend(f"  {describe_entry(*entry)}" for entry in entries)
+        if count > len(entries):
+            lines.append(f"  ... и еще {count - len(entries)}")
+    await update.message.reply_text("\n".join(lines)[:TELEGRAM_MESSAGE_LIMIT])
+
+async def inline_find(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    inline_query = update.inline_query
+    result = await db_executor.run(repository.search, inline_query.query, INLINE_RESULT_LIMIT, INLINE_GROUP_LIMIT)
+    schedules = await asyncio.gather(*(get_group_schedule_db(*group) for group in result["groups"]))
+    articles = [
+        InlineQueryResultArticle(
+            id=f"group-{number}", title=group_name, description=f"{faculty}, курс {course}",
+            input_message_content=InputTextMessageContent(schedule.week_text[:TELEGRAM_MESSAGE_LIMIT]),
+        )
+        for number, ((faculty, course, group_name), schedule) in enumerate(zip(result["groups"], schedules))
+    ]
+    articles.extend(
+        InlineQueryResultArticle(
+            id=f"entry-{number}", title=subject,
+            description=f"{describe_group(faculty, course, group_name)}, {day} {format_range(start, end)}",
+            input_message_content=InputTextMessageContent(describe_entry(faculty, course, group_name, day, start, end,
+                                                                         subject)),
+        )
+        for number, (faculty, course, group_name, day, start, end, subject) in enumerate(result["entries"])
+    )
+    await inline_query.answer(articles, cache_time=INLINE_CACHE_TIME)
+
+def collect_push_batches(day_index: int) -> list:
+    # Один проход по подписчикам, упорядоченным по группе: каждая группа строится один раз
+    batches = []
+    batch = []
+    current_key = None
+    schedule = None
+    for user_id, chat_id, faculty, course, group_name in repository.iter_push_targets():
+        if (faculty, course, group_name) != current_key:
+            current_key = (faculty, course, group_name)
+            schedule = student_schedules.build(faculty, course, group_name)
+        if not schedule.has_classes[day_index]:
+            continue
+        batch.append((user_id, chat_id, schedule.day_texts[day_index]))
+        if len(batch) >= PUSH_BATCH_SIZE:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+    return batches
+
+async def push_daily_schedule(context: ContextTypes.DEFAULT_TYPE) -> None:
+    day_index = datetime.now(BOT_TIMEZONE).weekday()
+    if day_index >= len(DAYS_OF_WEEK):
+        return
+    batches = await db_executor.run(collect_push_batches, day_index)
+    for number, batch in enumerate(batches):
+        context.job_queue.run_once(send_push_batch, when=number * PUSH_BATCH_INTERVAL, data=batch,
+                                   name=f"push-{number}")
+    logger.info("Рассылка расписания: %s сообщений в %s пачках", sum(map(len, batches)), len(batches))
+
+async def send_push_batch(context: ContextTypes.DEFAULT_TYPE) -> None:
+    batch = context.job.data
+    results = await asyncio.gather(
+        *(context.bot.send_message(chat_id, text) for _, chat_id, text in batch), return_exceptions=True
+    )
+    retry = []
+    blocked = []
+    retry_after = 0
+    for message, result in zip(batch, results):
+        if isinstance(result, RetryAfter):
+            retry.append(message)
+            delay = result.retry_after
+            retry_after = max(retry_after, delay.total_seconds() if isinstance(delay, timedelta) else delay)
+        elif isinstance(result, Forbidden):
+            blocked.append(message[0])
+        elif isinstance(result, Exception):
+            logger.warning("Не удалось отправить расписание в чат %s: %s", message[1], result)
+    if blocked:
+        await db_executor.write(repository.set_notify, blocked, False)
+    if retry:
+        context.job_queue.run_once(send_push_batch, when=retry_after, data=retry, name=context.job.name)
+        logger.warning("Лимит Bot API: %s сообщений повторю через %s с", len(retry), retry_after)
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
-    logger.info(f"Пользователь {user.id} отменил диалог командой /cancel.")
+    logger.info("Пользователь %s отменил диалог командой /cancel.", user.id)
     context.user_data.clear()
     await update.message.reply_text(
         "Действие отменено. Чтобы начать заново, введите /start.",
@@ -456,7 +787,7 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 async def done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
-    logger.info(f"Пользователь {user.id} завершил ввод расписания.")
+    logger.info("Пользователь %s завершил ввод расписания.", user.id)
     context.user_data.clear()
     await update.message.reply_text(
         "Отлично! Ввод данных завершен.\nЧтобы начать заново, введите /start.",
@@ -464,9 +795,31 @@ async def done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     )
     return ConversationHandler.END
 
-def main() -> None:
-    init_db()
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+def build_persistence() -> SqlitePersistence:
+    return SqlitePersistence(
+        db_pool, db_executor, FACULTIES, DAYS_OF_WEEK,
+        faculty_key=CALLBACK_FACULTY, course_key=CALLBACK_COURSE, group_key=CALLBACK_GROUP, day_key=CALLBACK_DAY,
+        update_interval=PERSISTENCE_FLUSH_INTERVAL,
+    )
+
+def build_application(token: str = TELEGRAM_BOT_TOKEN, base_url: str = TELEGRAM_API_URL, webhook: bool = False,
+                      concurrent_updates: int = CONCURRENT_UPDATES, persistence: SqlitePersistence = None,
+                      metrics_port: int = None) -> Application:
+    builder = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(PerUserUpdateProcessor(concurrent_updates))
+        .request(InstrumentedRequest(metrics, connection_pool_size=concurrent_updates))
+    )
+    if persistence is not None:
+        builder = builder.persistence(persistence)
+    if base_url:
+        builder = builder.base_url(base_url)
+    if webhook:
+        builder = builder.updater(None)
+    if metrics_port:
+        builder = builder.post_init(start_metrics).post_shutdown(stop_metrics)
+    application = builder.build()
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("start", start)],
         states={
@@ -479,7 +832,7 @@ def main() -> None:
                 MessageHandler(filters.Regex("^⬅️ Назад$"), back_handler),
                 MessageHandler(filters.Regex("^➕ Добавить группу$"), prompt_add_group),
                 CallbackQueryHandler(select_group_inline),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, lambda update, context: update.message.reply_text("Используйте кнопки для выбора или добавления группы.")),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, remind_group_buttons),
             ],
             ADD_GROUP_PROMPT: [
                 MessageHandler(filters.Regex("^⬅️ Отмена добавления$"), cancel_add_group),
@@ -497,20 +850,87 @@ def main() -> None:
                 MessageHandler(filters.Regex("^➕ Добавить еще запись$"), add_another_entry),
                 MessageHandler(filters.Regex("^ EЯ Выбрать другую группу$"), go_to_group_selection),
                 MessageHandler(filters.Regex("^📊 Вывести расписание дня$"), prompt_export_day),
+                MessageHandler(filters.Regex("^🗓 Неделя группы$"), show_group_week),
+                MessageHandler(filters.Regex("^🏛 Неделя факультета \\(Excel\\)$"), export_faculty_week),
                 MessageHandler(filters.Regex("^✅ Завершить$"), done),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, lambda update, context: update.message.reply_text("Используйте предложенные кнопки.")),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, remind_option_buttons),
             ],
             EXPORT_ASK_DAY: [
-                MessageHandler(filters.Regex("^⬅️ Назад$"), lambda update, context: POST_SAVE_OPTIONS),
+                MessageHandler(filters.Regex("^⬅️ Назад$"), back_to_post_save_options),
                 MessageHandler(filters.TEXT & ~filters.COMMAND, export_day_schedule),
+            ],
+            EXPORT_ASK_FORMAT: [
+                MessageHandler(filters.Regex("^⬅️ Назад$"), prompt_export_day),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, export_day_in_format),
             ]
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        name="schedule_editor",
+        persistent=persistence is not None,
     )
     application.add_handler(conv_handler)
     application.add_handler(CommandHandler("start", start))
-    logger.info("Запуск бота (v3)...")
-    application.run_polling()
+    application.add_handler(CommandHandler("conflicts", report_conflicts))
+    application.add_handler(CommandHandler("subscribe", subscribe))
+    application.add_handler(CommandHandler("unsubscribe", unsubscribe))
+    application.add_handler(CommandHandler("today", show_today))
+    application.add_handler(CommandHandler("tomorrow", show_tomorrow))
+    application.add_handler(CommandHandler("week", show_week))
+    application.add_handler(CommandHandler("find", find_schedule))
+    application.add_handler(InlineQueryHandler(inline_find))
+    if application.job_queue is not None and WORKER_INDEX == 0:
+        # В JobQueue дни недели считаются с воскресенья (0), рассылка идет с понедельника по субботу
+        application.job_queue.run_daily(push_daily_schedule, PUSH_TIME, days=tuple(range(1, len(DAYS_OF_WEEK) + 1)),
+                                        name="daily-push")
+        application.job_queue.run_repeating(trim_change_log, CHANGES_TRIM_INTERVAL, name="changes-trim")
+    if application.job_queue is not None and CLUSTER_WORKERS > 1:
+        application.job_queue.run_repeating(sync_caches, CACHE_SYNC_INTERVAL, name="cache-sync")
+    application.add_handler(MessageHandler(
+        filters.Document.FileExtension("xlsx") | filters.Document.FileExtension("csv"), import_schedule_document
+    ))
+    for handlers in application.handlers.values():
+        metrics.instrument_handlers(handlers)
+    return application
+
+def main() -> None:
+    errors = validate_config()
+    if errors:
+        for error in errors:
+            logger.error("Ошибка конфигурации: %s", error)
+        sys.exit(1)
+    init_db()
+    if BOT_MODE == "cluster":
+        from cluster import run_cluster
+
+        logger.info("Запуск бота (v3, режим cluster, воркеров %s)...", CLUSTER_WORKERS)
+        try:
+            asyncio.run(run_cluster(
+                [sys.executable, os.path.abspath(__file__)], CLUSTER_WORKERS, WEBHOOK_LISTEN, WEBHOOK_PORT,
+                WEBHOOK_PATH, WORKER_BASE_PORT, token=TELEGRAM_BOT_TOKEN, base_url=TELEGRAM_API_URL,
+                webhook_url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET,
+            ))
+        except KeyboardInterrupt:
+            pass
+        db_pool.close()
+        logger.info("Бот остановлен.")
+        return
+    webhook = BOT_MODE == "webhook"
+    application = build_application(webhook=webhook, persistence=build_persistence(),
+                                    metrics_port=None if webhook else METRICS_PORT)
+    logger.info("Запуск бота (v3, режим %s)...", BOT_MODE)
+    if webhook:
+        from webhook import serve_webhook
+
+        try:
+            asyncio.run(serve_webhook(application, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH,
+                                      webhook_url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET, metrics=metrics))
+        except KeyboardInterrupt:
+            pass
+    else:
+        application.run_polling()
+    export_engine.shutdown()
+    db_executor.shutdown()
+    db_pool.close()
     logger.info("Бот остановлен.")
 
 if __name__ == "__main__":
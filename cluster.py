@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector, web
+from telegram import Bot, Update
+
+from updates import raw_update_owner
+from webhook import SECRET_HEADER, stop_on_signals
+
+logger = logging.getLogger(__name__)
+
+WORKER_LISTEN = "127.0.0.1"
+FORWARD_TIMEOUT = 10.0
+WORKER_START_TIMEOUT = 60.0
+WORKER_STOP_TIMEOUT = 15.0
+WORKER_RESTART_DELAY = 1.0
+
+
+def shard_for(owner, workers: int) -> int:
+    # Владелец всегда попадает к одному воркеру: там его диалог, user_data и очередь обновлений
+    return owner % workers if owner is not None else 0
+
+
+def create_receiver_app(worker_urls: list, path: str, secret_token: str = None) -> web.Application:
+    forward_headers = {"Content-Type": "application/json"}
+    if secret_token:
+        forward_headers[SECRET_HEADER] = secret_token
+
+    async def open_session(app: web.Application):
+        app["session"] = ClientSession(connector=TCPConnector(limit=0),
+                                       timeout=ClientTimeout(total=FORWARD_TIMEOUT))
+
+    async def close_session(app: web.Application):
+        await app["session"].close()
+
+    async def receive_update(request: web.Request) -> web.Response:
+        if secret_token and request.headers.get(SECRET_HEADER) != secret_token:
+            return web.Response(status=403)
+        body = await request.read()
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return web.Response(status=400)
+        if not isinstance(data, dict):
+            return web.Response(status=400)
+        worker = shard_for(raw_update_owner(data), len(worker_urls))
+        try:
+            async with request.app["session"].post(worker_urls[worker], data=body, headers=forward_headers) as response:
+                return web.Response(status=response.status)
+        except (ClientError, asyncio.TimeoutError) as e:
+            # Ответ не 2xx: Telegram доставит обновление повторно
+            logger.warning("Воркер %s не принял обновление: %s", worker, e)
+            return web.Response(status=503)
+
+    async def health(request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.on_startup.append(open_session)
+    app.on_cleanup.append(close_session)
+    app.router.add_post(path, receive_update)
+    app.router.add_get("/healthz", health)
+    return app
+
+
+class WorkerSupervisor:
+    def __init__(self, command: list, workers: int, base_port: int, stop_event: asyncio.Event):
+        self.command = command
+        self.workers = workers
+        self.base_port = base_port
+        self.stop_event = stop_event
+        self._processes = {}
+        self._tasks = []
+
+    def worker_url(self, index: int, path: str) -> str:
+        return f"http://{WORKER_LISTEN}:{self.base_port + index}{path}"
+
+    def _worker_env(self, index: int) -> dict:
+        env = {**os.environ, "BOT_MODE": "webhook", "CLUSTER_WORKERS": str(self.workers),
+               "WORKER_INDEX": str(index), "WEBHOOK_LISTEN": WORKER_LISTEN,
+               "WEBHOOK_PORT": str(self.base_port + index)}
+        # Вебхук в Telegram регистрирует только приемник
+        env.pop("WEBHOOK_URL", None)
+        return env
+
+    async def _keep_running(self, index: int):
+        while not self.stop_event.is_set():
+            process = await asyncio.create_subprocess_exec(*self.command, env=self._worker_env(index))
+            self._processes[index] = process
+            logger.info("Воркер %s запущен (pid %s, порт %s)", index, process.pid, self.base_port + index)
+            code = await process.wait()
+            if self.stop_event.is_set():
+                break
+            logger.error("Воркер %s завершился с кодом %s, перезапуск через %s с", index, code, WORKER_RESTART_DELAY)
+            await asyncio.sleep(WORKER_RESTART_DELAY)
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._keep_running(index)) for index in range(self.workers)]
+
+    async def wait_ready(self, timeout: float = WORKER_START_TIMEOUT) -> bool:
+        deadline = time.monotonic() + timeout
+        async with ClientSession(timeout=ClientTimeout(total=1.0)) as session:
+            for index in range(self.workers):
+                while True:
+                    try:
+                        async with session.get(self.worker_url(index, "/healthz")) as response:
+                            if response.status == 200:
+                                break
+                    except (ClientError, asyncio.TimeoutError):
+                        pass
+                    if self.stop_event.is_set():
+                        return False
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Воркер {index} не запустился за {timeout} с")
+                    await asyncio.sleep(0.1)
+        return True
+
+    async def stop(self):
+        self.stop_event.set()
+        processes = [process for process in self._processes.values() if process.returncode is None]
+        for process in processes:
+            process.terminate()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(process.wait() for process in processes)), WORKER_STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            for process in processes:
+                if process.returncode is None:
+                    logger.warning("Воркер pid %s не остановился за %s с, завершаю принудительно",
+                                   process.pid, WORKER_STOP_TIMEOUT)
+                    process.kill()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def run_cluster(command: list, workers: int, listen: str, port: int, path: str, base_port: int,
+                      token: str = None, base_url: str = None, webhook_url: str = None, secret_token: str = None,
+                      stop_event: asyncio.Event = None):
+    stop_event = stop_event or stop_on_signals()
+    supervisor = WorkerSupervisor(command, workers, base_port, stop_event)
+    runner = web.AppRunner(create_receiver_app(
+        [supervisor.worker_url(index, path) for index in range(workers)], path, secret_token
+    ))
+    await supervisor.start()
+    try:
+        if await supervisor.wait_ready():
+            await runner.setup()
+            await web.TCPSite(runner, listen, port).start()
+            if webhook_url:
+                async with Bot(token, **({"base_url": base_url} if base_url else {})) as bot:
+                    await bot.set_webhook(url=webhook_url, secret_token=secret_token,
+                                          allowed_updates=Update.ALL_TYPES)
+            logger.info("Приемник вебхука слушает %s:%s%s, воркеров: %s", listen, port, path, workers)
+            await stop_event.wait()
+    finally:
+        await runner.cleanup()
+        await supervisor.stop()
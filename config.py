@@ -0,0 +1,128 @@
+import os
+import re
+import sqlite3
+import sys
+from datetime import time as dt_time
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+CONFIG_ERRORS = []
+
+
+def _env(name: str, default, parse):
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        return parse(raw)
+    except (ValueError, ZoneInfoNotFoundError) as e:
+        CONFIG_ERRORS.append(f"{name}={raw!r}: {e}")
+        return default
+
+
+TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
+DB_NAME = os.environ.get("SCHEDULE_DB", "schedule_bot_v2.db")
+BOT_MODE = os.environ.get("BOT_MODE", "polling")
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = _env("WEBHOOK_PORT", 8443, int)
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+CONCURRENT_UPDATES = _env("CONCURRENT_UPDATES", 64, int)
+PERSISTENCE_FLUSH_INTERVAL = _env("PERSISTENCE_FLUSH_INTERVAL", 10, int)
+METRICS_LISTEN = os.environ.get("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = _env("METRICS_PORT", 0, int)
+PROFILE_SLOW_UPDATE_SECONDS = _env("PROFILE_SLOW_UPDATE_SECONDS", 0.0, float)
+PROFILE_SAMPLE_RATE = _env("PROFILE_SAMPLE_RATE", 0.05, float)
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+BOT_TIMEZONE = _env("BOT_TIMEZONE", ZoneInfo("Europe/Moscow"), ZoneInfo)
+PUSH_TIME = _env("PUSH_TIME", dt_time(7, 0), dt_time.fromisoformat).replace(tzinfo=BOT_TIMEZONE)
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL")
+# Режим cluster: приемник вебхука и CLUSTER_WORKERS процессов бота на портах от WORKER_BASE_PORT
+CLUSTER_WORKERS = _env("CLUSTER_WORKERS", 1, int)
+WORKER_INDEX = _env("WORKER_INDEX", 0, int)
+WORKER_BASE_PORT = _env("WORKER_BASE_PORT", 9000, int)
+CACHE_SYNC_INTERVAL = _env("CACHE_SYNC_INTERVAL", 1.0, float)
+# Журнал изменений нужен воркерам на секунды; старые записи удаляет первый воркер
+CHANGES_RETENTION_HOURS = _env("CHANGES_RETENTION_HOURS", 24.0, float)
+
+TOKEN_RE = re.compile(r"^\d+:[A-Za-z0-9_-]{30,}$")
+WEBHOOK_SECRET_RE = re.compile(r"^[A-Za-z0-9_-]{1,256}$")
+
+
+def validate() -> list:
+    errors = list(CONFIG_ERRORS)
+    if not TELEGRAM_BOT_TOKEN:
+        errors.append("TELEGRAM_BOT_TOKEN: не задан токен бота")
+    elif not TOKEN_RE.match(TELEGRAM_BOT_TOKEN):
+        errors.append("TELEGRAM_BOT_TOKEN: неверный формат токена")
+    if BOT_MODE not in ("polling", "webhook", "cluster"):
+        errors.append(f"BOT_MODE={BOT_MODE!r}: ожидается polling, webhook или cluster")
+    if TELEGRAM_API_URL and urlparse(TELEGRAM_API_URL).scheme not in ("http", "https"):
+        errors.append(f"TELEGRAM_API_URL={TELEGRAM_API_URL!r}: ожидается http(s) адрес Bot API")
+    if BOT_MODE in ("webhook", "cluster"):
+        if WEBHOOK_URL and urlparse(WEBHOOK_URL).scheme != "https":
+            errors.append(f"WEBHOOK_URL={WEBHOOK_URL!r}: Telegram принимает только https")
+        if not WEBHOOK_PATH.startswith("/"):
+            errors.append(f"WEBHOOK_PATH={WEBHOOK_PATH!r}: путь должен начинаться с /")
+        if WEBHOOK_SECRET is not None and not WEBHOOK_SECRET_RE.match(WEBHOOK_SECRET):
+            errors.append("WEBHOOK_SECRET: допустимы 1-256 символов A-Z, a-z, 0-9, _ и -")
+        if not 0 < WEBHOOK_PORT < 65536:
+            errors.append(f"WEBHOOK_PORT={WEBHOOK_PORT}: порт вне диапазона")
+    if CLUSTER_WORKERS < 1:
+        errors.append(f"CLUSTER_WORKERS={CLUSTER_WORKERS}: нужен хотя бы один воркер")
+    elif not 0 <= WORKER_INDEX < CLUSTER_WORKERS:
+        errors.append(f"WORKER_INDEX={WORKER_INDEX}: ожидается номер от 0 до {CLUSTER_WORKERS - 1}")
+    if BOT_MODE == "cluster":
+        worker_ports = range(WORKER_BASE_PORT, WORKER_BASE_PORT + CLUSTER_WORKERS)
+        if WORKER_BASE_PORT < 1 or worker_ports.stop > 65536:
+            errors.append(f"WORKER_BASE_PORT={WORKER_BASE_PORT}: порты воркеров вне диапазона")
+        elif WEBHOOK_PORT in worker_ports:
+            errors.append(f"WEBHOOK_PORT={WEBHOOK_PORT}: совпадает с портом воркера")
+    if CACHE_SYNC_INTERVAL <= 0:
+        errors.append(f"CACHE_SYNC_INTERVAL={CACHE_SYNC_INTERVAL}: нужен положительный интервал")
+    if CHANGES_RETENTION_HOURS <= 0:
+        errors.append(f"CHANGES_RETENTION_HOURS={CHANGES_RETENTION_HOURS}: нужен положительный срок")
+    elif CHANGES_RETENTION_HOURS * 3600 <= CACHE_SYNC_INTERVAL:
+        errors.append(f"CHANGES_RETENTION_HOURS={CHANGES_RETENTION_HOURS}: срок меньше CACHE_SYNC_INTERVAL")
+    if not 0 <= METRICS_PORT < 65536:
+        errors.append(f"METRICS_PORT={METRICS_PORT}: порт вне диапазона")
+    if CONCURRENT_UPDATES < 1:
+        errors.append(f"CONCURRENT_UPDATES={CONCURRENT_UPDATES}: нужно хотя бы 1")
+    if PERSISTENCE_FLUSH_INTERVAL <= 0:
+        errors.append(f"PERSISTENCE_FLUSH_INTERVAL={PERSISTENCE_FLUSH_INTERVAL}: нужен положительный интервал")
+    if not 0 <= PROFILE_SAMPLE_RATE <= 1:
+        errors.append(f"PROFILE_SAMPLE_RATE={PROFILE_SAMPLE_RATE}: доля должна быть от 0 до 1")
+    db_dir = os.path.dirname(os.path.abspath(DB_NAME))
+    if not os.access(db_dir, os.W_OK):
+        errors.append(f"SCHEDULE_DB={DB_NAME!r}: нет доступа на запись в {db_dir}")
+    return errors
+
+
+def schema_status() -> str:
+    from storage import MIGRATIONS
+
+    if not os.path.exists(DB_NAME):
+        return f"база {DB_NAME} будет создана со схемой v{len(MIGRATIONS)}"
+    conn = sqlite3.connect(f"file:{os.path.abspath(DB_NAME)}?mode=ro", uri=True)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+    if version == len(MIGRATIONS):
+        return f"схема базы {DB_NAME} актуальна (v{version})"
+    return f"схема базы {DB_NAME} будет обновлена с v{version} до v{len(MIGRATIONS)}"
+
+
+def main() -> int:
+    errors = validate()
+    for error in errors:
+        print(f"Ошибка конфигурации: {error}", file=sys.stderr)
+    if errors:
+        return 1
+    print(f"Конфигурация в порядке: режим {BOT_MODE}, {schema_status()}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
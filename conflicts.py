@@ -0,0 +1,87 @@
+from bisect import bisect_left
+from heapq import heappop, heappush
+
+from schedule_parser import format_time
+
+
+class IntervalIndex:
+    # Для каждого ключа (группа, аудитория, преподаватель + день) занятия не пересекаются,
+    # поэтому отсортированные начала однозначно задают порядок концов
+    def __init__(self):
+        self._starts = {}
+        self._entries = {}
+
+    def __len__(self) -> int:
+        return sum(len(starts) for starts in self._starts.values())
+
+    def find_overlap(self, key, start: int, end: int):
+        starts = self._starts.get(key)
+        if not starts:
+            return None
+        position = bisect_left(starts, end)
+        if position == 0:
+            return None
+        entry = self._entries[key][position - 1]
+        return entry if entry[1] > start else None
+
+    def add(self, key, start: int, end: int, subject: str):
+        conflict = self.find_overlap(key, start, end)
+        if conflict is not None:
+            return conflict
+        starts = self._starts.setdefault(key, [])
+        position = bisect_left(starts, start)
+        starts.insert(position, start)
+        self._entries.setdefault(key, []).insert(position, (start, end, subject))
+        return None
+
+    def upsert(self, key, start: int, end: int, subject: str):
+        # Занятие с тем же началом заменяется, как UPSERT в schedule_entries: проверяются только соседи
+        starts = self._starts.setdefault(key, [])
+        entries = self._entries.setdefault(key, [])
+        position = bisect_left(starts, start)
+        replaced = position < len(starts) and starts[position] == start
+        if position > 0 and entries[position - 1][1] > start:
+            return entries[position - 1]
+        following = position + 1 if replaced else position
+        if following < len(entries) and entries[following][0] < end:
+            return entries[following]
+        if replaced:
+            entries[position] = (start, end, subject)
+        else:
+            starts.insert(position, start)
+            entries.insert(position, (start, end, subject))
+        return None
+
+
+def split_conflicts(entries: list) -> tuple:
+    index = IntervalIndex()
+    accepted = []
+    conflicts = []
+    for start, end, subject in entries:
+        conflict = index.add(None, start, end, subject)
+        if conflict is None:
+            accepted.append((start, end, subject))
+        else:
+            conflicts.append((conflict, (start, end, subject)))
+    return accepted, conflicts
+
+
+def iter_conflicts(rows):
+    # Один проход по строкам, отсортированным по (ключ, день, начало). В куче по концу лежат занятия,
+    # которые еще идут: новое пересекается с каждым из них, а не только с самым длинным
+    current = None
+    active = []
+    for key, day, start, end, subject in rows:
+        if (key, day) != current:
+            current = (key, day)
+            active = []
+        while active and active[0][0] <= start:
+            heappop(active)
+        for active_end, active_start, active_subject in sorted(active, key=lambda item: item[1]):
+            yield key, day, (active_start, active_end, active_subject), (start, end, subject)
+        heappush(active, (end, start, subject))
+
+
+def describe_conflict(first: tuple, second: tuple) -> str:
+    return (f"{format_time(first[0])}-{format_time(first[1])} {first[2]} и "
+            f"{format_time(second[0])}-{format_time(second[1])} {second[2]}")
@@ -0,0 +1,94 @@
+import asyncio
+import csv
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from storage import ConnectionPool, ScheduleRepository
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ['Факультет', 'Курс', 'Группа', 'День', 'Время', 'Предмет']
+FORMAT_XLSX = "xlsx"
+FORMAT_XLSX_BY_FACULTY = "xlsx_by_faculty"
+FORMAT_CSV = "csv"
+EXPORT_FORMATS = (FORMAT_XLSX, FORMAT_XLSX_BY_FACULTY, FORMAT_CSV)
+FILE_EXTENSIONS = {FORMAT_XLSX: "xlsx", FORMAT_XLSX_BY_FACULTY: "xlsx", FORMAT_CSV: "csv"}
+
+
+def write_csv(rows) -> tuple:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    # BOM нужен, чтобы Excel открыл кириллицу в UTF-8
+    return buffer.getvalue().encode("utf-8-sig"), count
+
+
+def write_xlsx(rows, sheet_per_faculty: bool = False) -> tuple:
+    # openpyxl заметно замедляет запуск бота, поэтому загружается при первом Excel-файле
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_faculty = None
+    count = 0
+    for row in rows:
+        if sheet is None or (sheet_per_faculty and row[0] != sheet_faculty):
+            sheet_faculty = row[0]
+            sheet = workbook.create_sheet(title=sheet_faculty[:31] if sheet_per_faculty else "Расписание")
+            sheet.append(EXPORT_COLUMNS)
+        sheet.append(row)
+        count += 1
+    if sheet is None:
+        workbook.create_sheet(title="Расписание").append(EXPORT_COLUMNS)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue(), count
+
+
+def render_export(repository: ScheduleRepository, export_format: str, **filters) -> tuple:
+    rows = repository.iter_schedule_data(**filters)
+    if export_format == FORMAT_CSV:
+        return write_csv(rows)
+    if export_format == FORMAT_XLSX:
+        return write_xlsx(rows)
+    if export_format == FORMAT_XLSX_BY_FACULTY:
+        return write_xlsx(rows, sheet_per_faculty=True)
+    raise ValueError(f"Неизвестный формат экспорта: {export_format}")
+
+
+def _render_export_in_process(db_name: str, days: list, time_slots: list, export_format: str, filters: dict) -> tuple:
+    pool = ConnectionPool(db_name, size=1)
+    try:
+        return render_export(ScheduleRepository(pool, days, time_slots), export_format, **filters)
+    finally:
+        pool.close()
+
+
+class ExportEngine:
+    def __init__(self, repository: ScheduleRepository, workers: int = 2, use_processes: bool = False):
+        self.repository = repository
+        self.use_processes = use_processes
+        if use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+
+    async def export(self, export_format: str, **filters) -> tuple:
+        loop = asyncio.get_running_loop()
+        if self.use_processes:
+            repository = self.repository
+            return await loop.run_in_executor(
+                self._executor, _render_export_in_process,
+                repository.pool.db_name, repository.days, repository.time_slots, export_format, filters
+            )
+        return await loop.run_in_executor(
+            self._executor, lambda: render_export(self.repository, export_format, **filters)
+        )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
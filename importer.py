@@ -0,0 +1,130 @@
+import csv
+import io
+import logging
+
+from conflicts import describe_conflict
+from export import EXPORT_COLUMNS
+from schedule_parser import ScheduleParseError, parse_time_range
+from storage import ScheduleRepository
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 20
+MAX_GROUP_NAME_LENGTH = 50
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def iter_csv_rows(payload: bytes):
+    text = io.TextIOWrapper(io.BytesIO(payload), encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.reader(text, dialect)
+
+
+def iter_xlsx_rows(payload: bytes):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(payload), read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_file_rows(filename: str, payload: bytes):
+    if filename.lower().endswith(".csv"):
+        return iter_csv_rows(payload)
+    if filename.lower().endswith(".xlsx"):
+        return iter_xlsx_rows(payload)
+    raise ValueError(f"Неподдерживаемый формат файла: {filename}")
+
+
+class ScheduleImporter:
+    def __init__(self, repository: ScheduleRepository, faculties: list, courses: list,
+                 chunk_size: int = IMPORT_CHUNK_SIZE, write=None):
+        self.repository = repository
+        self.write = write or (lambda func, *args: func(*args))
+        self.faculties = set(faculties)
+        self.courses = {int(course) for course in courses}
+        self.days = set(repository.days)
+        self.chunk_size = chunk_size
+
+    def validate_row(self, row) -> tuple:
+        values = [_cell_text(value) for value in row[:len(EXPORT_COLUMNS)]]
+        if len(values) < len(EXPORT_COLUMNS):
+            raise ValueError("не хватает столбцов")
+        faculty, course_text, group_name, day, time_slot, subject = values
+        if faculty not in self.faculties:
+            raise ValueError(f"неизвестный факультет '{faculty}'")
+        try:
+            course = int(course_text)
+        except ValueError:
+            raise ValueError(f"неверный курс '{course_text}'") from None
+        if course not in self.courses:
+            raise ValueError(f"неверный курс '{course_text}'")
+        if not group_name or len(group_name) > MAX_GROUP_NAME_LENGTH:
+            raise ValueError("пустое или слишком длинное название группы")
+        if day not in self.days:
+            raise ValueError(f"неизвестный день '{day}'")
+        try:
+            start, end = parse_time_range(time_slot)
+        except ScheduleParseError:
+            raise ValueError(f"неверное время '{time_slot}'") from None
+        if not subject:
+            raise ValueError("пустой предмет")
+        return faculty, course, group_name, day, start, end, subject
+
+    def _error(self, result: dict, line_number: int, message: str):
+        result["error_count"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append(f"Строка {line_number}: {message}")
+
+    def _flush(self, chunk: dict, result: dict):
+        if chunk:
+            line_numbers = [line_number for line_number, _ in chunk.values()]
+            entries = [entry for _, entry in chunk.values()]
+            written = self.write(self.repository.upsert_entries, entries)
+            result["groups_created"] += written["groups_created"]
+            result["imported"] += len(entries) - len(written["conflicts"])
+            for position, conflict in written["conflicts"]:
+                self._error(result, line_numbers[position],
+                            f"пересечение: {describe_conflict(conflict, entries[position][4:])}")
+            chunk.clear()
+
+    def import_rows(self, rows) -> dict:
+        result = {"rows": 0, "imported": 0, "groups_created": 0, "error_count": 0, "errors": []}
+        chunk = {}
+        for line_number, row in enumerate(rows, start=1):
+            if not row or all(_cell_text(value) == "" for value in row):
+                continue
+            if [_cell_text(value) for value in row[:len(EXPORT_COLUMNS)]] == EXPORT_COLUMNS:
+                continue
+            result["rows"] += 1
+            try:
+                entry = self.validate_row(row)
+            except ValueError as e:
+                self._error(result, line_number, str(e))
+                continue
+            chunk[entry[:5]] = (line_number, entry)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, result)
+        self._flush(chunk, result)
+        logger.info("Импорт завершен: %s записей, новых групп %s, ошибок %s",
+                    result["imported"], result["groups_created"], result["error_count"])
+        return result
+
+    def import_file(self, filename: str, payload: bytes) -> dict:
+        return self.import_rows(iter_file_rows(filename, payload))
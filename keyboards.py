@@ -0,0 +1,65 @@
+from functools import lru_cache
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
+
+BACK_BUTTON = "⬅️ Назад"
+ADD_GROUP_BUTTON = "➕ Добавить группу"
+CANCEL_ADD_GROUP_BUTTON = "⬅️ Отмена добавления"
+GROUP_WEEK_BUTTON = "🗓 Неделя группы"
+FACULTY_WEEK_BUTTON = "🏛 Неделя факультета (Excel)"
+POST_SAVE_BUTTONS = [
+    ["➕ Добавить еще запись"], [" EЯ Выбрать другую группу"],
+    ["📊 Вывести расписание дня"], [GROUP_WEEK_BUTTON, FACULTY_WEEK_BUTTON], ["✅ Завершить"]
+]
+GROUP_KEYBOARD_CACHE_SIZE = 512
+
+def create_reply_keyboard(buttons: list, columns: int, one_time: bool = True, add_back: bool = False, add_add_group: bool = False, custom_buttons: list = None) -> ReplyKeyboardMarkup:
+    keyboard = []
+    row = []
+    for i, button_text in enumerate(buttons):
+        row.append(button_text)
+        if (i + 1) % columns == 0 or i == len(buttons) - 1:
+            keyboard.append(row)
+            row = []
+    if add_add_group:
+         keyboard.append([ADD_GROUP_BUTTON])
+    if custom_buttons:
+        for btn_row in custom_buttons:
+             keyboard.append(btn_row)
+    if add_back:
+        keyboard.append([BACK_BUTTON])
+    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=one_time)
+
+def create_inline_keyboard(buttons: list, columns: int) -> InlineKeyboardMarkup:
+    keyboard = []
+    row = []
+    for i, button_text in enumerate(buttons):
+        row.append(InlineKeyboardButton(button_text, callback_data=button_text))
+        if (i + 1) % columns == 0 or i == len(buttons) - 1:
+            keyboard.append(row)
+            row = []
+    return InlineKeyboardMarkup(keyboard)
+
+
+
+class KeyboardRegistry:
+    def __init__(self, faculties: list, courses: list, days: list, export_buttons: list):
+        self.faculties = create_reply_keyboard(faculties, columns=3)
+        self.courses = create_reply_keyboard(courses, columns=3, add_back=True)
+        self.days = create_reply_keyboard(days, columns=2, add_back=True)
+        self.export_formats = create_reply_keyboard(export_buttons, columns=1, add_back=True)
+        self.group_actions = create_reply_keyboard([], columns=1, add_back=True, add_add_group=True)
+        self.back_only = ReplyKeyboardMarkup([[BACK_BUTTON]], resize_keyboard=True)
+        self.cancel_add_group = ReplyKeyboardMarkup([[CANCEL_ADD_GROUP_BUTTON]], resize_keyboard=True)
+        self.post_save_options = ReplyKeyboardMarkup(POST_SAVE_BUTTONS, resize_keyboard=True, one_time_keyboard=False)
+        self._groups = lru_cache(maxsize=GROUP_KEYBOARD_CACHE_SIZE)(self._build_groups)
+
+    @staticmethod
+    def _build_groups(groups: tuple) -> InlineKeyboardMarkup:
+        return create_inline_keyboard(groups, columns=3)
+
+    def groups(self, groups: list) -> InlineKeyboardMarkup:
+        return self._groups(tuple(groups))
+
+    def groups_cache_info(self):
+        return self._groups.cache_info()
@@ -0,0 +1,173 @@
+import cProfile
+import contextvars
+import functools
+import logging
+import os
+import random
+import time
+from bisect import bisect_left
+
+from telegram.ext import ConversationHandler
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+HELP = {
+    "handler_seconds": "Время обработки обновления обработчиком",
+    "handler_db_queries": "Число запросов к БД за одно обновление",
+    "db_query_seconds": "Время запроса к БД, включая ожидание пула потоков",
+    "telegram_api_seconds": "Время вызова Bot API",
+}
+
+_update_queries = contextvars.ContextVar("update_queries", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+class SlowUpdateProfiler:
+    def __init__(self, threshold: float, sample_rate: float, directory: str):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self._active = False
+
+    def start(self):
+        # cProfile один на поток: параллельные обновления профилируются по одному
+        if self._active or random.random() >= self.sample_rate:
+            return None
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile, name: str, elapsed: float):
+        profile.disable()
+        self._active = False
+        if elapsed < self.threshold:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{name}-{int(time.time() * 1000)}.prof")
+        profile.dump_stats(path)
+        logger.warning("Медленное обновление %s: %.3f с, профиль сохранен в %s", name, elapsed, path)
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "schedule_bot", profiler: SlowUpdateProfiler = None):
+        self.prefix = prefix
+        self.profiler = profiler
+        self._histograms = {}
+        self._collectors = []
+
+    def histogram(self, name: str, labels: dict, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        key = (name, tuple(labels.items()))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(buckets)
+        return histogram
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def observe_query(self, name: str, elapsed: float):
+        self.histogram("db_query_seconds", {"query": name}).observe(elapsed)
+        queries = _update_queries.get()
+        if queries is not None:
+            queries[0] += 1
+
+    def observe_api_call(self, method: str, elapsed: float):
+        self.histogram("telegram_api_seconds", {"method": method}).observe(elapsed)
+
+    def instrument_handler(self, callback):
+        name = callback.__name__
+
+        @functools.wraps(callback)
+        async def wrapper(update, context):
+            queries = [0]
+            token = _update_queries.set(queries)
+            profile = self.profiler.start() if self.profiler is not None else None
+            started = time.perf_counter()
+            try:
+                return await callback(update, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                if profile is not None:
+                    self.profiler.finish(profile, name, elapsed)
+                _update_queries.reset(token)
+                self.histogram("handler_seconds", {"handler": name}).observe(elapsed)
+                self.histogram("handler_db_queries", {"handler": name}, QUERY_BUCKETS).observe(queries[0])
+
+        return wrapper
+
+    def instrument_handlers(self, handlers):
+        for handler in handlers:
+            if isinstance(handler, ConversationHandler):
+                self.instrument_handlers(handler.entry_points)
+                for state_handlers in handler.states.values():
+                    self.instrument_handlers(state_handlers)
+                self.instrument_handlers(handler.fallbacks)
+            elif not getattr(handler.callback, "__wrapped__", None):
+                handler.callback = self.instrument_handler(handler.callback)
+
+    def render(self) -> str:
+        prefix = self.prefix
+        lines = []
+        previous = None
+        for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+            metric = f"{prefix}_{name}"
+            if name != previous:
+                previous = name
+                if name in HELP:
+                    lines.append(f"# HELP {metric} {HELP[name]}")
+                lines.append(f"# TYPE {metric} histogram")
+            labels = dict(labels)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{metric}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+            lines.append(f"{metric}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{_labels(labels)} {histogram.count}")
+        # Строки одной метрики в формате Prometheus должны идти подряд
+        gauges = {}
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                gauges.setdefault(name, []).append((labels, value))
+        for name, samples in gauges.items():
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(f"{metric}{_labels(labels)} {value}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+class InstrumentedRequest(HTTPXRequest):
+    def __init__(self, metrics: MetricsRegistry, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+
+    async def do_request(self, url: str, method: str, *args, **kwargs) -> tuple:
+        started = time.perf_counter()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        finally:
+            self.metrics.observe_api_call(url.rsplit("/", 1)[-1], time.perf_counter() - started)
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+
+from telegram.ext import BasePersistence, ConversationHandler, PersistenceInput
+
+from storage import ConnectionPool, DatabaseExecutor
+
+logger = logging.getLogger(__name__)
+
+FLUSH_DELAY_SECONDS = 0.05
+LOAD_BATCH_SIZE = 5000
+END = ConversationHandler.END
+
+
+class SqlitePersistence(BasePersistence):
+    def __init__(self, pool: ConnectionPool, executor: DatabaseExecutor, faculties: list, days: list,
+                 faculty_key: str, course_key: str, group_key: str, day_key: str, update_interval: float = 60):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.pool = pool
+        self.executor = executor
+        self.faculties = list(faculties)
+        self.faculty_codes = {faculty: code for code, faculty in enumerate(self.faculties)}
+        self.days = list(days)
+        self.day_codes = {day: code for code, day in enumerate(self.days)}
+        self.faculty_key = faculty_key
+        self.course_key = course_key
+        self.group_key = group_key
+        self.day_key = day_key
+        self._known_keys = {faculty_key, course_key, group_key, day_key}
+        self._pending_users = {}
+        self._pending_conversations = {}
+        self._flush_task = None
+
+    def encode_user_data(self, data: dict) -> tuple:
+        extra = {key: value for key, value in data.items() if key not in self._known_keys}
+        return (
+            self.faculty_codes.get(data.get(self.faculty_key)),
+            data.get(self.course_key),
+            data.get(self.group_key),
+            self.day_codes.get(data.get(self.day_key)),
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+        )
+
+    def decode_user_data(self, faculty, course, group_name, day, extra) -> dict:
+        data = json.loads(extra) if extra else {}
+        if faculty is not None:
+            data[self.faculty_key] = self.faculties[faculty]
+        if course is not None:
+            data[self.course_key] = course
+        if group_name is not None:
+            data[self.group_key] = group_name
+        if day is not None:
+            data[self.day_key] = self.days[day]
+        return data
+
+    def _load_user_data(self) -> dict:
+        user_data = {}
+        decode = self.decode_user_data
+        with self.pool.connection() as conn:
+            cursor = conn.execute("""
+                SELECT s.user_id, s.faculty, s.course, g.group_name, s.day, s.extra
+                FROM user_sessions s LEFT JOIN groups g ON g.id = s.group_id
+            """)
+            while True:
+                rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+                if not rows:
+                    break
+                for user_id, faculty, course, group_name, day, extra in rows:
+                    user_data[user_id] = decode(faculty, course, group_name, day, extra)
+        return user_data
+
+    def _load_conversations(self, name: str) -> dict:
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT chat_id, user_id, state FROM conversation_states WHERE name = ?", (name,)
+            ).fetchall()
+        return {(chat_id, user_id): state for chat_id, user_id, state in rows}
+
+    def _write_batch(self, users: dict, conversations: dict):
+        upserts = []
+        deletes = []
+        for user_id, data in users.items():
+            if not data:
+                deletes.append((user_id,))
+                continue
+            faculty, course, group_name, day, extra = self.encode_user_data(data)
+            faculty_name = self.faculties[faculty] if faculty is not None else None
+            upserts.append((user_id, faculty, course, faculty_name, course, group_name, day, extra))
+        states = []
+        ended = []
+        for (name, key), state in conversations.items():
+            chat_id, user_id = key
+            if state is None or state == END:
+                ended.append((name, chat_id, user_id))
+            else:
+                states.append((name, chat_id, user_id, state))
+        with self.pool.connection() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO user_sessions (user_id, faculty, course, group_id, day, extra)
+                VALUES (?, ?, ?, (SELECT id FROM groups WHERE faculty = ? AND course = ? AND group_name = ?), ?, ?)
+                """,
+                upserts
+            )
+            conn.executemany("DELETE FROM user_sessions WHERE user_id = ?", deletes)
+            conn.executemany(
+                "INSERT OR REPLACE INTO conversation_states (name, chat_id, user_id, state) VALUES (?, ?, ?, ?)",
+                states
+            )
+            conn.executemany(
+                "DELETE FROM conversation_states WHERE name = ? AND chat_id = ? AND user_id = ?", ended
+            )
+        logger.debug("Сохранено сессий: %s, состояний диалогов: %s", len(users), len(conversations))
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_soon())
+
+    async def _flush_soon(self):
+        # Application обновляет всех изменившихся пользователей пачкой раз в update_interval;
+        # короткая задержка собирает эту пачку в одну транзакцию
+        while self._pending_users or self._pending_conversations:
+            await asyncio.sleep(FLUSH_DELAY_SECONDS)
+            await self._flush_pending()
+
+    async def _flush_pending(self):
+        users, self._pending_users = self._pending_users, {}
+        conversations, self._pending_conversations = self._pending_conversations, {}
+        if users or conversations:
+            await self.executor.write(self._write_batch, users, conversations)
+
+    async def get_user_data(self) -> dict:
+        return await self.executor.run(self._load_user_data)
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._pending_users[user_id] = data
+        self._schedule_flush()
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._pending_users[user_id] = {}
+        self._schedule_flush()
+
+    async def get_conversations(self, name: str) -> dict:
+        return await self.executor.run(self._load_conversations, name)
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        self._pending_conversations[(name, key)] = new_state
+        self._schedule_flush()
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def get_callback_data(self):
+        return None
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def flush(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self._flush_pending()
@@ -0,0 +1,99 @@
+import re
+from functools import lru_cache
+
+DAY_START_MINUTES = 6 * 60
+DAY_END_MINUTES = 21 * 60
+DEFAULT_DURATION_MINUTES = 60
+
+_TIME = r"(?P<{0}h>\d{{1,2}})(?:[:.](?P<{0}m>\d{{2}}))?"
+TIME_RANGE_PATTERN = (
+    r"(?:с\s+)?" + _TIME.format("s")
+    + r"(?:\s*(?:-|–|—|до)\s*" + _TIME.format("e") + r")?"
+)
+_SUBJECT = r"\s*(?:[-–—:|]\s*|\s+)(?P<subject>\S.*?)\s*$"
+LINE_RE = re.compile(r"^\s*" + TIME_RANGE_PATTERN + _SUBJECT, re.IGNORECASE)
+START_ONLY_LINE_RE = re.compile(r"^\s*(?:с\s+)?" + _TIME.format("s") + _SUBJECT, re.IGNORECASE)
+TIME_RANGE_RE = re.compile(r"^\s*" + TIME_RANGE_PATTERN + r"\s*$", re.IGNORECASE)
+
+
+class ScheduleParseError(ValueError):
+    pass
+
+
+def _minutes(hours: str, minutes: str) -> int:
+    hours = int(hours)
+    minutes = int(minutes) if minutes else 0
+    if hours > 23 or minutes > 59:
+        raise ScheduleParseError(f"{hours}:{minutes:02d}")
+    return hours * 60 + minutes
+
+
+def _range_from_match(match) -> tuple:
+    start = _minutes(match.group("sh"), match.group("sm"))
+    if "eh" in match.re.groupindex and match.group("eh") is not None:
+        end = _minutes(match.group("eh"), match.group("em"))
+    else:
+        end = start + DEFAULT_DURATION_MINUTES
+    if end <= start or start < DAY_START_MINUTES or end > DAY_END_MINUTES:
+        raise ScheduleParseError(f"{format_time(start)}-{format_time(end)}")
+    return start, end
+
+
+def format_time(minutes: int) -> str:
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+@lru_cache(maxsize=4096)
+def format_range(start: int, end: int) -> str:
+    return f"с {format_time(start)} до {format_time(end)}"
+
+
+def format_entry(start: int, end: int, subject: str) -> str:
+    # Строка должна разбираться обратно в ту же запись: конец пишется, если он не по умолчанию
+    if end - start == DEFAULT_DURATION_MINUTES:
+        return f"{format_time(start)} - {subject}"
+    return f"{format_time(start)}-{format_time(end)} - {subject}"
+
+
+def parse_time_range(text: str) -> tuple:
+    match = TIME_RANGE_RE.match(text)
+    if match is None:
+        raise ScheduleParseError(text)
+    return _range_from_match(match)
+
+
+def _entry_from_match(match, line: str) -> tuple:
+    if match.group("eh") is not None:
+        start = _minutes(match.group("sh"), match.group("sm"))
+        end = _minutes(match.group("eh"), match.group("em"))
+        if end <= start:
+            # "10 - 2 курс": число после дефиса относится к предмету, а не к концу пары
+            match = START_ONLY_LINE_RE.match(line)
+    start, end = _range_from_match(match)
+    return start, end, match.group("subject")
+
+
+def parse_schedule_line(line: str) -> tuple:
+    match = LINE_RE.match(line)
+    if match is None:
+        raise ScheduleParseError(line)
+    return _entry_from_match(match, line)
+
+
+def parse_schedule_text(text: str) -> tuple:
+    entries = []
+    errors = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        match = LINE_RE.match(line)
+        if match is None:
+            errors.append(f"Неверный формат строки: {line}")
+            continue
+        try:
+            entries.append(_entry_from_match(match, line))
+        except ScheduleParseError as e:
+            errors.append(f"Неверное время: {e}")
+    entries.sort()
+    return entries, errors
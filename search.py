@@ -0,0 +1,22 @@
+import re
+
+from schedule_parser import format_range
+
+SEARCH_TOKEN_RE = re.compile(r"\w+")
+MAX_QUERY_TOKENS = 8
+
+
+def match_query(text: str):
+    # Каждое слово - префикс, порядок не важен: "мат выс" найдет "Высшая математика"
+    tokens = SEARCH_TOKEN_RE.findall(text)[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def describe_group(faculty: str, course: int, group_name: str) -> str:
+    return f"{group_name} ({faculty}, курс {course})"
+
+
+def describe_entry(faculty: str, course: int, group_name: str, day: str, start: int, end: int, subject: str) -> str:
+    return f"{subject} — {describe_group(faculty, course, group_name)}, {day} {format_range(start, end)}"
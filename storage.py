@@ -0,0 +1,705 @@
+import asyncio
+import functools
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from conflicts import IntervalIndex, iter_conflicts
+from schedule_parser import format_range, parse_time_range
+from search import match_query
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = 4
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_MS = 5000
+MIGRATION_BUSY_TIMEOUT_MS = 10 * 60 * 1000
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=67108864",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+class ConnectionPool:
+    def __init__(self, db_name: str, size: int = POOL_SIZE, timeout: float = 30.0):
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._connections) < self.size:
+                conn = self._connect()
+                self._connections.append(conn)
+                logger.debug("Открыто соединение %s/%s с %s", len(self._connections), self.size, self.db_name)
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Нет свободных соединений с {self.db_name} за {self.timeout} с") from None
+
+    def release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._idle = queue.LifoQueue()
+
+
+def _migration_1(conn, repository):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            faculty TEXT NOT NULL,
+            course INTEGER NOT NULL,
+            group_name TEXT NOT NULL,
+            UNIQUE(faculty, course, group_name)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schedule_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            faculty TEXT NOT NULL,
+            course INTEGER NOT NULL,
+            group_name TEXT NOT NULL,
+            day_of_week TEXT NOT NULL,
+            time_slot TEXT NOT NULL,
+            subject TEXT NOT NULL
+        )
+    """)
+
+
+def _migration_2(conn, repository):
+    conn.execute("CREATE TEMP TABLE day_map (name TEXT PRIMARY KEY, code INTEGER NOT NULL)")
+    conn.execute("CREATE TEMP TABLE slot_map (label TEXT PRIMARY KEY, code INTEGER NOT NULL)")
+    conn.executemany("INSERT INTO day_map VALUES (?, ?)", repository.day_codes.items())
+    conn.executemany("INSERT INTO slot_map VALUES (?, ?)", repository.slot_codes.items())
+    conn.execute("""
+        INSERT OR IGNORE INTO groups (faculty, course, group_name)
+        SELECT DISTINCT faculty, course, group_name FROM schedule_entries
+    """)
+    conn.execute("""
+        CREATE TABLE schedule_entries_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+            day INTEGER NOT NULL,
+            slot INTEGER NOT NULL,
+            subject TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO schedule_entries_new (id, group_id, day, slot, subject)
+        SELECT e.id, g.id, d.code, s.code, e.subject
+        FROM schedule_entries e
+        JOIN groups g ON g.faculty = e.faculty AND g.course = e.course AND g.group_name = e.group_name
+        JOIN day_map d ON d.name = e.day_of_week
+        JOIN slot_map s ON s.label = e.time_slot
+    """)
+    dropped = conn.execute("SELECT (SELECT COUNT(*) FROM schedule_entries) - (SELECT COUNT(*) FROM schedule_entries_new)").fetchone()[0]
+    if dropped:
+        logger.warning("При миграции пропущено %s записей с неизвестным днем или временем", dropped)
+    conn.execute("DROP TABLE schedule_entries")
+    conn.execute("ALTER TABLE schedule_entries_new RENAME TO schedule_entries")
+    conn.execute("CREATE INDEX idx_schedule_group_day_slot ON schedule_entries (group_id, day, slot)")
+    conn.execute("CREATE INDEX idx_schedule_day_group ON schedule_entries (day, group_id)")
+    conn.execute("DROP TABLE temp.day_map")
+    conn.execute("DROP TABLE temp.slot_map")
+
+
+def _migration_3(conn, repository):
+    conn.execute("""
+        CREATE TABLE user_sessions (
+            user_id INTEGER PRIMARY KEY,
+            faculty INTEGER,
+            course INTEGER,
+            group_id INTEGER REFERENCES groups(id) ON DELETE SET NULL,
+            day INTEGER,
+            extra TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE conversation_states (
+            name TEXT NOT NULL,
+            chat_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            state INTEGER NOT NULL,
+            PRIMARY KEY (name, chat_id, user_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _migration_4(conn, repository):
+    conn.execute("CREATE TEMP TABLE slot_minutes (code INTEGER PRIMARY KEY, start_min INTEGER, end_min INTEGER)")
+    conn.executemany(
+        "INSERT INTO slot_minutes VALUES (?, ?, ?)",
+        [(code, *parse_time_range(label)) for label, code in repository.slot_codes.items()]
+    )
+    conn.execute("""
+        CREATE TABLE schedule_entries_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+            day INTEGER NOT NULL,
+            start_min INTEGER NOT NULL,
+            end_min INTEGER NOT NULL,
+            subject TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO schedule_entries_new (id, group_id, day, start_min, end_min, subject)
+        SELECT e.id, e.group_id, e.day, m.start_min, m.end_min, e.subject
+        FROM schedule_entries e JOIN slot_minutes m ON m.code = e.slot
+    """)
+    conn.execute("DROP TABLE schedule_entries")
+    conn.execute("ALTER TABLE schedule_entries_new RENAME TO schedule_entries")
+    conn.execute("CREATE INDEX idx_schedule_group_day_start ON schedule_entries (group_id, day, start_min)")
+    conn.execute("CREATE INDEX idx_schedule_day_group ON schedule_entries (day, group_id)")
+    conn.execute("DROP TABLE temp.slot_minutes")
+
+
+def _migration_5(conn, repository):
+    # Из повторов одного занятия (группа, день, начало) остается последняя запись
+    dropped = conn.execute("""
+        DELETE FROM schedule_entries WHERE id NOT IN (
+            SELECT MAX(id) FROM schedule_entries GROUP BY group_id, day, start_min
+        )
+    """).rowcount
+    if dropped:
+        logger.warning("При миграции удалено %s повторов занятий с тем же началом", dropped)
+    conn.execute("DROP INDEX idx_schedule_group_day_start")
+    conn.execute("CREATE UNIQUE INDEX idx_schedule_group_day_start ON schedule_entries (group_id, day, start_min)")
+
+
+def _migration_6(conn, repository):
+    conn.execute("""
+        CREATE TABLE subscriptions (
+            user_id INTEGER PRIMARY KEY,
+            chat_id INTEGER NOT NULL,
+            group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+            notify INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    conn.execute("CREATE INDEX idx_subscriptions_notify ON subscriptions (group_id) WHERE notify = 1")
+    conn.execute("CREATE INDEX idx_groups_name ON groups (group_name)")
+
+
+def _migration_7(conn, repository):
+    # Журнал изменений: 'S' - занятие добавлено или изменено, 'D' - удалено
+    conn.execute("""
+        CREATE TABLE schedule_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            start_min INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            end_min INTEGER,
+            subject TEXT,
+            changed_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    """)
+
+
+def _migration_8(conn, repository):
+    # Поиск идет по словарю различных названий предметов, а не по каждому занятию:
+    # названий тысячи, занятий миллионы. Триггеры ведут счетчики занятий по названию
+    conn.execute("CREATE TABLE subjects (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, entries INTEGER NOT NULL)")
+    conn.execute("CREATE INDEX idx_schedule_subject ON schedule_entries (subject)")
+    conn.execute("""
+        CREATE TRIGGER subjects_count_insert AFTER INSERT ON schedule_entries BEGIN
+            INSERT INTO subjects (name, entries) VALUES (new.subject, 1)
+            ON CONFLICT (name) DO UPDATE SET entries = entries + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER subjects_count_delete AFTER DELETE ON schedule_entries BEGIN
+            UPDATE subjects SET entries = entries - 1 WHERE name = old.subject;
+            DELETE FROM subjects WHERE name = old.subject AND entries = 0;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER subjects_count_update AFTER UPDATE OF subject ON schedule_entries
+        WHEN old.subject IS NOT new.subject BEGIN
+            UPDATE subjects SET entries = entries - 1 WHERE name = old.subject;
+            DELETE FROM subjects WHERE name = old.subject AND entries = 0;
+            INSERT INTO subjects (name, entries) VALUES (new.subject, 1)
+            ON CONFLICT (name) DO UPDATE SET entries = entries + 1;
+        END
+    """)
+    for table, column, index in (("subjects", "name", "subjects_fts"), ("groups", "group_name", "groups_fts")):
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE {index} USING fts5(
+                {column}, content='{table}', content_rowid='id', tokenize='unicode61', prefix='2 3'
+            )
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER {index}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {index} (rowid, {column}) VALUES (new.id, new.{column});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER {index}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {index} ({index}, rowid, {column}) VALUES ('delete', old.id, old.{column});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER {index}_update AFTER UPDATE OF {column} ON {table} BEGIN
+                INSERT INTO {index} ({index}, rowid, {column}) VALUES ('delete', old.id, old.{column});
+                INSERT INTO {index} (rowid, {column}) VALUES (new.id, new.{column});
+            END
+        """)
+    conn.execute("INSERT INTO subjects (name, entries) SELECT subject, COUNT(*) FROM schedule_entries GROUP BY subject")
+    conn.execute("INSERT INTO groups_fts (groups_fts) VALUES ('rebuild')")
+
+
+MIGRATIONS = [_migration_1, _migration_2, _migration_3, _migration_4, _migration_5, _migration_6, _migration_7,
+              _migration_8]
+
+UPSERT_ENTRY_SQL = """
+    INSERT INTO schedule_entries (group_id, day, start_min, end_min, subject) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (group_id, day, start_min) DO UPDATE SET end_min = excluded.end_min, subject = excluded.subject
+"""
+LOG_CHANGE_SQL = "INSERT INTO schedule_changes (group_id, day, start_min, op, end_min, subject) VALUES (?, ?, ?, ?, ?, ?)"
+
+
+class ScheduleRepository:
+    def __init__(self, pool: ConnectionPool, days: list, time_slots: list):
+        self.pool = pool
+        self.days = list(days)
+        self.time_slots = list(time_slots)
+        self.day_codes = {day: code for code, day in enumerate(self.days)}
+        self.slot_codes = {slot: code for code, slot in enumerate(self.time_slots)}
+
+    def schema_version(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self) -> int:
+        with self.pool.connection() as conn:
+            # Пока другой процесс мигрирует большую базу, BEGIN IMMEDIATE ждет дольше обычного busy_timeout
+            conn.execute(f"PRAGMA busy_timeout={MIGRATION_BUSY_TIMEOUT_MS}")
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                while version < len(MIGRATIONS):
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        # При выкатке старый и новый процессы стартуют вместе: под блокировкой версия читается
+                        # заново, и миграцию, которую уже применил другой процесс, второй раз не выполняем
+                        current = conn.execute("PRAGMA user_version").fetchone()[0]
+                        if current == version:
+                            MIGRATIONS[version](conn, self)
+                            conn.execute(f"PRAGMA user_version = {version + 1}")
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    if current != version:
+                        version = current
+                        continue
+                    version += 1
+                    logger.info("Схема БД %s обновлена до версии %s", self.pool.db_name, version)
+            finally:
+                conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return version
+
+    def _group_id(self, conn, faculty: str, course: int, group_name: str, create: bool = False):
+        if create:
+            conn.execute(
+                "INSERT OR IGNORE INTO groups (faculty, course, group_name) VALUES (?, ?, ?)",
+                (faculty, course, group_name)
+            )
+        row = conn.execute(
+            "SELECT id FROM groups WHERE faculty = ? AND course = ? AND group_name = ?",
+            (faculty, course, group_name)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _decode(self, rows) -> list:
+        days = self.days
+        return [(faculty, course, group_name, days[day], format_range(start, end), subject)
+                for faculty, course, group_name, day, start, end, subject in rows]
+
+    def add_group(self, faculty: str, course: int, group_name: str):
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT INTO groups (faculty, course, group_name) VALUES (?, ?, ?)",
+                (faculty, course, group_name)
+            )
+
+    def get_groups(self, faculty: str, course: int) -> list:
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT group_name FROM groups WHERE faculty = ? AND course = ? ORDER BY group_name",
+                (faculty, course)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete_day(self, faculty: str, course: int, group_name: str, day: str):
+        day_code = self.day_codes[day]
+        with self.pool.connection() as conn:
+            group_id = self._group_id(conn, faculty, course, group_name)
+            if group_id is not None:
+                starts = conn.execute(
+                    "SELECT start_min FROM schedule_entries WHERE group_id = ? AND day = ?", (group_id, day_code)
+                ).fetchall()
+                conn.execute("DELETE FROM schedule_entries WHERE group_id = ? AND day = ?", (group_id, day_code))
+                conn.executemany(
+                    LOG_CHANGE_SQL, [(group_id, day_code, start, "D", None, None) for start, in starts]
+                )
+
+    def replace_day(self, faculty: str, course: int, group_name: str, day: str, entries: list) -> dict:
+        day_code = self.day_codes[day]
+        with self.pool.connection() as conn:
+            group_id = self._group_id(conn, faculty, course, group_name, create=True)
+            stored = {start: (end, subject) for start, end, subject in conn.execute(
+                "SELECT start_min, end_min, subject FROM schedule_entries WHERE group_id = ? AND day = ?",
+                (group_id, day_code)
+            )}
+            wanted = {start: (end, subject) for start, end, subject in entries}
+            deleted = [start for start in stored if start not in wanted]
+            changed = [(start, end, subject) for start, (end, subject) in wanted.items()
+                       if stored.get(start) != (end, subject)]
+            conn.executemany(
+                "DELETE FROM schedule_entries WHERE group_id = ? AND day = ? AND start_min = ?",
+                [(group_id, day_code, start) for start in deleted]
+            )
+            conn.executemany(UPSERT_ENTRY_SQL, [(group_id, day_code, *entry) for entry in changed])
+            conn.executemany(
+                LOG_CHANGE_SQL,
+                [(group_id, day_code, start, "D", None, None) for start in deleted]
+                + [(group_id, day_code, start, "S", end, subject) for start, end, subject in changed]
+            )
+        inserted = sum(start not in stored for start, _, _ in changed)
+        return {"inserted": inserted, "updated": len(changed) - inserted, "deleted": len(deleted)}
+
+    def get_day_entries(self, faculty: str, course: int, group_name: str, day: str) -> list:
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT e.start_min, e.end_min, e.subject FROM schedule_entries e "
+                "JOIN groups g ON g.id = e.group_id "
+                "WHERE g.faculty = ? AND g.course = ? AND g.group_name = ? AND e.day = ? ORDER BY e.start_min",
+                (faculty, course, group_name, self.day_codes[day])
+            ).fetchall()
+
+    def get_group_week(self, faculty: str, course: int, group_name: str) -> list:
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT e.day, e.start_min, e.end_min, e.subject FROM schedule_entries e "
+                "JOIN groups g ON g.id = e.group_id "
+                "WHERE g.faculty = ? AND g.course = ? AND g.group_name = ? ORDER BY e.day, e.start_min",
+                (faculty, course, group_name)
+            ).fetchall()
+
+    def find_groups_by_name(self, group_name: str) -> list:
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT faculty, course, group_name FROM groups WHERE group_name = ? ORDER BY faculty, course",
+                (group_name,)
+            ).fetchall()
+
+    def set_subscription(self, user_id: int, chat_id: int, faculty: str, course: int, group_name: str) -> bool:
+        with self.pool.connection() as conn:
+            group_id = self._group_id(conn, faculty, course, group_name)
+            if group_id is None:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO subscriptions (user_id, chat_id, group_id, notify) VALUES (?, ?, ?, 1)",
+                (user_id, chat_id, group_id)
+            )
+        return True
+
+    def get_subscription(self, user_id: int):
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT g.faculty, g.course, g.group_name, s.notify FROM subscriptions s "
+                "JOIN groups g ON g.id = s.group_id WHERE s.user_id = ?",
+                (user_id,)
+            ).fetchone()
+
+    def set_notify(self, user_ids: list, notify: bool) -> int:
+        with self.pool.connection() as conn:
+            return conn.executemany(
+                "UPDATE subscriptions SET notify = ? WHERE user_id = ?", [(int(notify), user_id) for user_id in user_ids]
+            ).rowcount
+
+    def iter_push_targets(self, batch_size: int = 5000):
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT s.user_id, s.chat_id, g.faculty, g.course, g.group_name FROM subscriptions s "
+                "JOIN groups g ON g.id = s.group_id WHERE s.notify = 1 ORDER BY s.group_id"
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def iter_conflicts(self, batch_size: int = 5000):
+        days = self.days
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT group_id, day, start_min, end_min, subject FROM schedule_entries "
+                "ORDER BY group_id, day, start_min"
+            )
+
+            def rows():
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    yield from batch
+
+            for group_id, day, first, second in iter_conflicts(rows()):
+                # Названия групп нужны только для найденных пересечений
+                group = conn.execute(
+                    "SELECT faculty, course, group_name FROM groups WHERE id = ?", (group_id,)
+                ).fetchone()
+                yield group, days[day], first, second
+
+    def conflict_report(self, limit: int) -> tuple:
+        count = 0
+        conflicts = []
+        for conflict in self.iter_conflicts():
+            count += 1
+            if len(conflicts) < limit:
+                conflicts.append(conflict)
+        return count, conflicts
+
+    def upsert_entries(self, entries: list) -> dict:
+        # Как и при вводе вручную, пересекающиеся занятия группы не сохраняются, а возвращаются вызывающему
+        index = IntervalIndex()
+        stored = {}
+        groups_created = 0
+        accepted = []
+        conflicts = []
+        with self.pool.connection() as conn:
+            for key in {entry[:4] for entry in entries}:
+                faculty, course, group_name, day = key
+                for start, end, subject in conn.execute(
+                    "SELECT e.start_min, e.end_min, e.subject FROM schedule_entries e "
+                    "JOIN groups g ON g.id = e.group_id "
+                    "WHERE g.faculty = ? AND g.course = ? AND g.group_name = ? AND e.day = ?",
+                    (faculty, course, group_name, self.day_codes[day])
+                ):
+                    index.add(key, start, end, subject)
+                    stored[(*key, start)] = (end, subject)
+            for position, entry in enumerate(entries):
+                conflict = index.upsert(entry[:4], *entry[4:])
+                if conflict is not None:
+                    conflicts.append((position, conflict))
+                elif stored.get(entry[:5]) != entry[5:]:
+                    # Повторный импорт того же файла не пишет и не попадает в журнал изменений
+                    accepted.append(entry)
+            group_ids = {}
+            for faculty, course, group_name, *_ in accepted:
+                key = (faculty, course, group_name)
+                if key not in group_ids:
+                    groups_created += conn.execute(
+                        "INSERT OR IGNORE INTO groups (faculty, course, group_name) VALUES (?, ?, ?)", key
+                    ).rowcount
+                    group_ids[key] = self._group_id(conn, faculty, course, group_name)
+            rows = [
+                (group_ids[(faculty, course, group_name)], self.day_codes[day], start, end, subject)
+                for faculty, course, group_name, day, start, end, subject in accepted
+            ]
+            conn.executemany(UPSERT_ENTRY_SQL, rows)
+            conn.executemany(
+                LOG_CHANGE_SQL, [(group_id, day, start, "S", end, subject) for group_id, day, start, end, subject in rows]
+            )
+        return {"groups_created": groups_created, "conflicts": conflicts}
+
+    def changes_since(self, after_id: int = 0, limit: int = 1000) -> list:
+        days = self.days
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT c.id, g.faculty, g.course, g.group_name, c.day, c.op, c.start_min, c.end_min, c.subject, "
+                "c.changed_at FROM schedule_changes c LEFT JOIN groups g ON g.id = c.group_id "
+                "WHERE c.id > ? ORDER BY c.id LIMIT ?",
+                (after_id, limit)
+            ).fetchall()
+        return [(change_id, faculty, course, group_name, days[day], op, start, end, subject, changed_at)
+                for change_id, faculty, course, group_name, day, op, start, end, subject, changed_at in rows]
+
+    def search(self, text: str, limit: int, group_limit: int) -> dict:
+        query = match_query(text)
+        if query is None:
+            return {"groups": [], "subjects": [], "entries": [], "entry_count": 0}
+        days = self.days
+        with self.pool.connection() as conn:
+            groups = conn.execute(
+                "SELECT g.faculty, g.course, g.group_name FROM groups_fts f JOIN groups g ON g.id = f.rowid "
+                "WHERE groups_fts MATCH ? ORDER BY f.rank LIMIT ?",
+                (query, group_limit)
+            ).fetchall()
+            subjects = conn.execute(
+                "SELECT s.name, s.entries FROM subjects_fts f JOIN subjects s ON s.id = f.rowid "
+                "WHERE subjects_fts MATCH ? ORDER BY f.rank",
+                (query,)
+            ).fetchall()
+            entries = []
+            for name, _ in subjects:
+                if len(entries) >= limit:
+                    break
+                entries.extend(conn.execute(
+                    "SELECT g.faculty, g.course, g.group_name, e.day, e.start_min, e.end_min, e.subject "
+                    "FROM schedule_entries e JOIN groups g ON g.id = e.group_id WHERE e.subject = ? LIMIT ?",
+                    (name, limit - len(entries))
+                ))
+        return {
+            "groups": groups,
+            "subjects": subjects,
+            "entries": [(faculty, course, group_name, days[day], start, end, subject)
+                        for faculty, course, group_name, day, start, end, subject in entries],
+            "entry_count": sum(count for _, count in subjects),
+        }
+
+    def sync_position(self) -> tuple:
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT (SELECT COALESCE(MAX(id), 0) FROM schedule_changes), (SELECT COALESCE(MAX(id), 0) FROM groups)"
+            ).fetchone()
+
+    def trim_changes(self, older_than: int) -> int:
+        # Последняя запись остается всегда: по MAX(id) воркеры узнают свою позицию в журнале
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "DELETE FROM schedule_changes WHERE changed_at < ? AND id < (SELECT MAX(id) FROM schedule_changes)",
+                (older_than,)
+            ).rowcount
+
+    def iter_timetable_rows(self, faculty: str, course: int = None, group_name: str = None):
+        query = ("SELECT g.faculty, g.course, g.group_name, e.day, e.start_min, e.end_min, e.subject "
+                 "FROM groups g JOIN schedule_entries e ON e.group_id = g.id WHERE g.faculty = ?")
+        params = [faculty]
+        if course is not None:
+            query += " AND g.course = ?"
+            params.append(course)
+        if group_name:
+            query += " AND g.group_name = ?"
+            params.append(group_name)
+        query += " ORDER BY g.course, g.group_name"
+        with self.pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                yield from rows
+
+    def _schedule_query(self, faculty: str = None, course: int = None, group_name: str = None, day: str = None) -> tuple:
+        query = ("SELECT g.faculty, g.course, g.group_name, e.day, e.start_min, e.end_min, e.subject "
+                 "FROM schedule_entries e JOIN groups g ON g.id = e.group_id")
+        conditions = []
+        params = []
+        if faculty:
+            conditions.append("g.faculty = ?")
+            params.append(faculty)
+        if course is not None:
+            conditions.append("g.course = ?")
+            params.append(course)
+        if group_name:
+            conditions.append("g.group_name = ?")
+            params.append(group_name)
+        if day:
+            conditions.append("e.day = ?")
+            params.append(self.day_codes[day])
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY g.faculty, g.course, g.group_name, e.day, e.start_min"
+        return query, params
+
+    def get_schedule_data(self, faculty: str = None, course: int = None, group_name: str = None, day: str = None) -> list:
+        query, params = self._schedule_query(faculty, course, group_name, day)
+        with self.pool.connection() as conn:
+            return self._decode(conn.execute(query, params))
+
+    def iter_schedule_data(self, faculty: str = None, course: int = None, group_name: str = None, day: str = None,
+                           batch_size: int = 1000):
+        query, params = self._schedule_query(faculty, course, group_name, day)
+        with self.pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from self._decode(rows)
+
+
+class DatabaseExecutor:
+    def __init__(self, workers: int = POOL_SIZE, observer=None):
+        self.workers = workers
+        self.observer = observer
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-worker")
+        # SQLite пускает одного писателя: записи процесса идут в очередь одного потока,
+        # а не ждут блокировку в busy_timeout, отнимая потоки у чтений
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+    async def _submit(self, executor, func, args, kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        if self.observer is None:
+            return await loop.run_in_executor(executor, call)
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(executor, call)
+        finally:
+            self.observer(func.__name__, time.perf_counter() - started)
+
+    async def run(self, func, *args, **kwargs):
+        return await self._submit(self._executor, func, args, kwargs)
+
+    async def write(self, func, *args, **kwargs):
+        return await self._submit(self._writer, func, args, kwargs)
+
+    def write_blocking(self, func, *args, **kwargs):
+        # Для кода, который уже работает в потоке пула: длинная обработка идет там,
+        # а в очередь писателя попадает только сама запись
+        started = time.perf_counter()
+        try:
+            return self._writer.submit(func, *args, **kwargs).result()
+        finally:
+            if self.observer is not None:
+                self.observer(func.__name__, time.perf_counter() - started)
+
+    def shutdown(self):
+        self._writer.shutdown(wait=True)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,37 @@
+from cache import LRUCache
+from schedule_parser import format_time
+from storage import ScheduleRepository
+
+STUDENT_CACHE_SIZE = 8192
+
+
+class GroupSchedule:
+    def __init__(self, group_name: str, days: list, rows):
+        entries = [[] for _ in days]
+        for day, start, end, subject in rows:
+            entries[day].append(f"  {format_time(start)}-{format_time(end)} {subject}")
+        self.has_classes = [bool(day_entries) for day_entries in entries]
+        self.day_texts = [
+            f"{group_name}, {day_name}:\n" + ("\n".join(day_entries) if day_entries else "  Занятий нет")
+            for day_name, day_entries in zip(days, entries)
+        ]
+        week = [f"{day_name}:\n" + "\n".join(day_entries)
+                for day_name, day_entries in zip(days, entries) if day_entries]
+        self.week_text = f"{group_name}, неделя:\n\n" + "\n\n".join(week) if week else \
+            f"Для группы {group_name} расписание на неделю пустое."
+
+
+class StudentScheduleCache:
+    def __init__(self, repository: ScheduleRepository, cache_size: int = STUDENT_CACHE_SIZE, ttl: float = None):
+        self.repository = repository
+        self.cache = LRUCache(maxsize=cache_size, ttl=ttl)
+
+    def build(self, faculty: str, course: int, group_name: str) -> GroupSchedule:
+        rows = self.repository.get_group_week(faculty, course, group_name)
+        return GroupSchedule(group_name, self.repository.days, rows)
+
+    def invalidate_group(self, faculty: str, course: int, group_name: str):
+        self.cache.invalidate((faculty, course, group_name))
+
+    def clear(self):
+        self.cache.clear()
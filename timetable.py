@@ -0,0 +1,127 @@
+import csv
+import io
+
+from cache import LRUCache
+from schedule_parser import DAY_START_MINUTES, format_entry, format_range
+from storage import ScheduleRepository
+
+FORMAT_TEXT = "text"
+FORMAT_XLSX = "xlsx"
+FORMAT_CSV = "csv"
+RENDER_CACHE_SIZE = 2048
+
+
+class TimetableGrid:
+    def __init__(self, faculty: str, course: int, group_name: str, days: int, slots: int):
+        self.faculty = faculty
+        self.course = course
+        self.group_name = group_name
+        self.cells = [[None] * slots for _ in range(days)]
+
+    def put(self, day: int, start: int, end: int, subject: str):
+        slot = min(max((start - DAY_START_MINUTES) // 60, 0), len(self.cells[day]) - 1)
+        current = self.cells[day][slot]
+        if current is None:
+            self.cells[day][slot] = [(start, end, subject)]
+        else:
+            current.append((start, end, subject))
+
+
+def _cell_label(entries) -> str:
+    if not entries:
+        return None
+    # Занятия не с начала часа подписываются своим временем, чтобы не потеряться в почасовой сетке
+    return "; ".join(
+        subject if start % 60 == 0 and end - start == 60 else f"{format_range(start, end)}: {subject}"
+        for start, end, subject in entries
+    )
+
+
+def build_grids(rows, days: int, slots: int) -> list:
+    grids = {}
+    for faculty, course, group_name, day, start, end, subject in rows:
+        key = (faculty, course, group_name)
+        grid = grids.get(key)
+        if grid is None:
+            grid = grids[key] = TimetableGrid(faculty, course, group_name, days, slots)
+        grid.put(day, start, end, subject)
+    return list(grids.values())
+
+
+def render_text(grids: list, days: list, time_slots: list) -> str:
+    blocks = []
+    for grid in grids:
+        lines = [f"{grid.group_name} ({grid.faculty}, курс {grid.course})"]
+        for day_name, row in zip(days, grid.cells):
+            entries = [f"  {format_entry(*entry)}" for cell in row if cell for entry in cell]
+            if entries:
+                lines.append(f"{day_name}:")
+                lines.extend(entries)
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def render_csv(grids: list, days: list, time_slots: list) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Факультет", "Курс", "Группа", "Время", *days])
+    for grid in grids:
+        for slot, time_slot in enumerate(time_slots):
+            row = [_cell_label(grid.cells[day][slot]) or "" for day in range(len(days))]
+            if any(row):
+                writer.writerow([grid.faculty, grid.course, grid.group_name, time_slot, *row])
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+def render_xlsx(grids: list, days: list, time_slots: list) -> bytes:
+    from openpyxl import Workbook
+    from openpyxl.workbook.child import INVALID_TITLE_REGEX
+
+    workbook = Workbook(write_only=True)
+    titles = set()
+    for grid in grids:
+        # Название группы - произвольный текст, а символы / \ ? * [ ] : в имени листа openpyxl не принимает
+        name = INVALID_TITLE_REGEX.sub("_", grid.group_name)
+        title = name[:31]
+        suffix = 2
+        while title.lower() in titles:
+            title = f"{name[:27]} ({suffix})"
+            suffix += 1
+        titles.add(title.lower())
+        sheet = workbook.create_sheet(title=title)
+        sheet.append(["Время", *days])
+        for slot, time_slot in enumerate(time_slots):
+            sheet.append([time_slot, *(_cell_label(grid.cells[day][slot]) for day in range(len(days)))])
+    if not grids:
+        workbook.create_sheet(title="Расписание").append(["Время", *days])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+RENDERERS = {FORMAT_TEXT: render_text, FORMAT_CSV: render_csv, FORMAT_XLSX: render_xlsx}
+
+
+class TimetableBuilder:
+    def __init__(self, repository: ScheduleRepository, cache_size: int = RENDER_CACHE_SIZE):
+        self.repository = repository
+        self.cache = LRUCache(maxsize=cache_size)
+
+    def grids(self, faculty: str, course: int = None, group_name: str = None) -> list:
+        repository = self.repository
+        rows = repository.iter_timetable_rows(faculty, course, group_name)
+        return build_grids(rows, len(repository.days), len(repository.time_slots))
+
+    def render(self, output_format: str, faculty: str, course: int = None, group_name: str = None):
+        repository = self.repository
+        grids = self.grids(faculty, course, group_name)
+        return RENDERERS[output_format](grids, repository.days, repository.time_slots)
+
+    def invalidate_group(self, faculty: str, course: int, group_name: str):
+        # Отрисовки факультета и курса включают группу, поэтому сбрасываются вместе с ней
+        self.cache.invalidate_where(
+            lambda key: key[1] == faculty and key[2] in (None, course) and key[3] in (None, group_name)
+        )
+
+    def clear(self):
+        self.cache.clear()
@@ -0,0 +1,64 @@
+import asyncio
+from collections import defaultdict
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def update_owner(update: object):
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+def raw_update_owner(data: dict):
+    # То же, что update_owner, но по JSON обновления, без разбора в объекты telegram
+    for key, payload in data.items():
+        if key == "update_id" or not isinstance(payload, dict):
+            continue
+        for field in ("from", "user", "chat"):
+            owner = payload.get(field)
+            if isinstance(owner, dict) and isinstance(owner.get("id"), int):
+                return owner["id"]
+    return None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks = {}
+        self._waiters = defaultdict(int)
+
+    # process_update в PTB помечен @final, переопределяем сознательно: через do_process_update блокировка
+    # пользователя бралась бы уже внутри общего семафора. Проверено на python-telegram-bot 22.8, где базовый
+    # process_update только оборачивает do_process_update в семафор; вызов super() сохраняет этот лимит
+    async def process_update(self, update: object, coroutine) -> None:
+        owner = update_owner(update)
+        if owner is None:
+            await super().process_update(update, coroutine)
+            return
+        lock = self._locks.setdefault(owner, asyncio.Lock())
+        self._waiters[owner] += 1
+        try:
+            # Сначала очередь пользователя, потом общий лимит: ожидающие
+            # своей очереди обновления не занимают слоты других пользователей
+            async with lock:
+                await super().process_update(update, coroutine)
+        finally:
+            self._waiters[owner] -= 1
+            if not self._waiters[owner]:
+                del self._waiters[owner]
+                del self._locks[owner]
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
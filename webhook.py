@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import signal
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from metrics import CONTENT_TYPE, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def stop_on_signals() -> asyncio.Event:
+    # SIGTERM от супервизора или systemd завершает бота штатно, с сохранением состояния
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop_event.set)
+    return stop_event
+
+
+def add_metrics_route(app: web.Application, metrics: MetricsRegistry, path: str = "/metrics"):
+    async def serve(request: web.Request) -> web.Response:
+        return web.Response(body=metrics.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    app.router.add_get(path, serve)
+
+
+async def start_metrics_server(metrics: MetricsRegistry, listen: str, port: int) -> web.AppRunner:
+    app = web.Application()
+    add_metrics_route(app, metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, listen, port).start()
+    logger.info("Метрики доступны на %s:%s/metrics", listen, port)
+    return runner
+
+
+def create_webhook_app(application: Application, path: str, secret_token: str = None,
+                       metrics: MetricsRegistry = None) -> web.Application:
+    async def receive_update(request: web.Request) -> web.Response:
+        if secret_token and request.headers.get(SECRET_HEADER) != secret_token:
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        await application.update_queue.put(Update.de_json(data, application.bot))
+        return web.Response()
+
+    async def health(request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_post(path, receive_update)
+    app.router.add_get("/healthz", health)
+    if metrics is not None:
+        add_metrics_route(app, metrics)
+    return app
+
+
+async def serve_webhook(application: Application, listen: str, port: int, path: str,
+                        webhook_url: str = None, secret_token: str = None, stop_event: asyncio.Event = None,
+                        metrics: MetricsRegistry = None):
+    stop_event = stop_event or stop_on_signals()
+    web_app = create_webhook_app(application, path, secret_token, metrics)
+    runner = web.AppRunner(web_app)
+    async with application:
+        if webhook_url:
+            await application.bot.set_webhook(
+                url=webhook_url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES
+            )
+        await application.start()
+        await runner.setup()
+        await web.TCPSite(runner, listen, port).start()
+        logger.info("Вебхук слушает %s:%s%s", listen, port, path)
+        try:
+            await stop_event.wait()
+        finally:
+            await runner.cleanup()
+            await application.stop()